@@ -0,0 +1,217 @@
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_REGISTRY = 'barcodes.sqlite'
+
+# Generated barcode formats: 12-digit UPC-A starting with 01 and
+# 13-digit EAN-13 starting with 69 (Kuwait format used for Talabat)
+UPC_A = {'prefix': '01', 'length': 12}
+EAN_13 = {'prefix': '69', 'length': 13}
+
+# SQLite limits the number of host parameters per statement
+_QUERY_BATCH = 900
+
+
+def check_digit(body):
+    """GS1 mod-10 check digit for the digits of an EAN-13 / UPC-A body"""
+    # Weights alternate 3, 1, 3, ... starting from the rightmost body digit
+    total = 3 * sum(map(int, body[-1::-2])) + sum(map(int, body[-2::-2]))
+    return str((10 - total % 10) % 10)
+
+
+def is_valid(code):
+    """True if `code` is all digits and ends with the right check digit"""
+    return code.isdigit() and len(code) > 1 and check_digit(code[:-1]) == code[-1]
+
+
+def with_check_digit(body):
+    return body + check_digit(body)
+
+
+class BarcodeRegistry:
+    """Persistent registry of every barcode issued or seen across projects
+
+    Backed by SQLite with the code as primary key, so each collision check
+    is an index lookup even with millions of issued codes, and concurrent
+    scripts allocating at the same time cannot hand out the same code. The
+    assignments table remembers which barcode was given to which product
+    key (e.g. a Shopify Handle), so re-runs hand out the same codes.
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS barcodes (
+                code TEXT PRIMARY KEY,
+                project TEXT,
+                generated INTEGER NOT NULL,
+                issued_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS assignments (
+                project TEXT NOT NULL,
+                key TEXT NOT NULL,
+                code TEXT NOT NULL,
+                PRIMARY KEY (project, key)
+            ) WITHOUT ROWID
+        ''')
+        self._random = random.Random()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM barcodes').fetchone()[0]
+
+    def __contains__(self, code):
+        return self.conn.execute('SELECT 1 FROM barcodes WHERE code = ?', (code,)).fetchone() is not None
+
+    def _existing(self, codes):
+        found = set()
+        for start in range(0, len(codes), _QUERY_BATCH):
+            batch = codes[start:start + _QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(f'SELECT code FROM barcodes WHERE code IN ({placeholders})', batch)
+            found.update(code for (code,) in rows)
+        return found
+
+    def generated(self, codes, project):
+        """The codes in `codes` this registry generated for `project`"""
+        found = set()
+        for start in range(0, len(codes), _QUERY_BATCH):
+            batch = codes[start:start + _QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f'SELECT code FROM barcodes WHERE generated = 1 AND project = ? AND code IN ({placeholders})',
+                [project, *batch])
+            found.update(code for (code,) in rows)
+        return found
+
+    def _insert(self, codes, project, generated):
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO barcodes (code, project, generated, issued_at) VALUES (?, ?, ?, ?)',
+            [(code, project, int(generated), now) for code in codes])
+
+    def allocate(self, count, prefix=UPC_A['prefix'], length=UPC_A['length'], project=None):
+        """Hand out `count` new unique barcodes with valid check digits
+
+        Codes are `prefix` + random digits + GS1 check digit, `length` digits
+        in total. All codes are reserved in one transaction.
+        """
+        random_digits = length - len(prefix) - 1
+        if random_digits < 1:
+            raise ValueError(f"length {length} leaves no room for digits after prefix {prefix!r}")
+        allocated = []
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            while len(allocated) < count:
+                needed = count - len(allocated)
+                # Over-generate a little so one round is almost always enough
+                candidates = {
+                    with_check_digit(prefix + str(self._random.randrange(10 ** random_digits)).zfill(random_digits))
+                    for _ in range(needed + needed // 10 + 1)
+                }
+                candidates -= set(allocated)
+                candidates = list(candidates - self._existing(list(candidates)))[:needed]
+                self._insert(candidates, project, generated=True)
+                allocated.extend(candidates)
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return allocated
+
+    def assigned(self, keys, project):
+        """{key: barcode} for the keys of `project` that already have one"""
+        found = {}
+        for start in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[start:start + _QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f'SELECT key, code FROM assignments WHERE project = ? AND key IN ({placeholders})',
+                [project, *batch])
+            found.update(rows)
+        return found
+
+    def assign(self, keys, project, prefix=UPC_A['prefix'], length=UPC_A['length']):
+        """Barcode for each key, allocating new codes only for keys never seen before
+
+        Returns a list aligned with `keys`. A key keeps its barcode across
+        runs for as long as the registry file is kept.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        codes = self.assigned(unique_keys, project)
+        new_keys = [key for key in unique_keys if key not in codes]
+        if new_keys:
+            new_codes = self.allocate(len(new_keys), prefix, length, project)
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO assignments (project, key, code) VALUES (?, ?, ?)',
+                    [(project, key, code) for key, code in zip(new_keys, new_codes)])
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            # Re-read in case a concurrent run assigned some of the same keys first
+            codes.update(self.assigned(new_keys, project))
+        return [codes[key] for key in keys]
+
+    def register(self, codes, project=None):
+        """Record externally supplied barcodes (e.g. vendor barcodes) so they
+        are never generated for another product"""
+        codes = [code for code in codes if code]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._insert(codes, project, generated=False)
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+
+
+def allocate_barcodes(count, prefix=UPC_A['prefix'], length=UPC_A['length'], project=None, path=DEFAULT_REGISTRY):
+    """Allocate `count` barcodes from the shared registry"""
+    if count == 0:
+        return []
+    with BarcodeRegistry(path) as registry:
+        return registry.allocate(count, prefix, length, project)
+
+
+def barcodes_for_keys(keys, project, prefix=UPC_A['prefix'], length=UPC_A['length'], path=DEFAULT_REGISTRY):
+    """Stable barcode for each product key (see BarcodeRegistry.assign)"""
+    keys = list(keys)
+    if not keys:
+        return []
+    with BarcodeRegistry(path) as registry:
+        return registry.assign(keys, project, prefix, length)
+
+
+def generated_barcodes(codes, project, path=DEFAULT_REGISTRY):
+    """The codes in `codes` generated for `project` by the shared registry
+
+    Empty if there is no registry yet; the file is not created.
+    """
+    codes = list(dict.fromkeys(codes))
+    if not codes or not Path(path).exists():
+        return set()
+    with BarcodeRegistry(path) as registry:
+        return registry.generated(codes, project)
+
+
+def register_barcodes(codes, project=None, path=DEFAULT_REGISTRY):
+    """Record existing barcodes in the shared registry"""
+    with BarcodeRegistry(path) as registry:
+        registry.register(list(codes), project)
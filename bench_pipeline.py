@@ -0,0 +1,352 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+RESULTS_FILE = Path('bench_results.jsonl')
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+TARGETS = ['process_unique_products', 'brand_ingest', 'create_talabat_csv', 'downloader', 'translator']
+
+# A run this much slower than the previous one with the same settings is flagged
+REGRESSION_THRESHOLD = 1.2
+# ... unless it is only this many seconds slower (timer noise on tiny runs)
+REGRESSION_MIN_SECONDS = 0.25
+
+# talabat CLI invocations timed by --startup (median of STARTUP_RUNS runs);
+# `talabat --help` should stay within STARTUP_BUDGET seconds
+STARTUP_COMMANDS = {'help': ['--help'], 'summary': ['summary', '--json', ''], 'check': ['check']}
+STARTUP_RUNS = 10
+STARTUP_BUDGET = 0.1
+STARTUP_REGRESSION_MIN_SECONDS = 0.02
+
+# Smallest valid JPEG header; each served image gets unique trailing bytes so
+# the content-addressed store does not collapse them into one object
+JPEG_STUB = bytes.fromhex('ffd8ffe000104a46494600010100000100010000') + b'\x00' * 2048
+
+
+def synthetic_export(path, rows, image_base_url, max_images, seed=42):
+    """Write a Shopify-format export with `rows` rows
+
+    Products have one to three rows (extra rows are variants with only
+    Handle and variant columns, like real exports). 60% of titles are
+    "English || Arabic", half of the variants carry a vendor barcode, 95%
+    of products are active and the first `max_images` products have an
+    Image Src on the local CDN.
+    """
+    rng = np.random.default_rng(seed)
+    product = np.sort(rng.integers(0, max(rows * 2 // 3, 1), rows))
+    first = np.r_[True, product[1:] != product[:-1]]
+    ids = pd.Series(product).astype(str)
+
+    bilingual = rng.random(rows) < 0.6
+    titles = 'Product ' + ids + ' Washable Markers'
+    titles = titles.where(~bilingual, titles + ' || أقلام تلوين ' + ids)
+    has_barcode = rng.random(rows) < 0.5
+    barcodes = pd.Series(rng.integers(10 ** 10, 10 ** 11, rows)).astype(str).radd('07')
+    with_image = first & (np.cumsum(first) <= max_images)
+
+    df = pd.DataFrame({
+        'Handle': 'product-' + ids,
+        'Title': titles.where(first, ''),
+        'Body (HTML)': np.where(first, '<p>Synthetic <span>product</span></p>', ''),
+        'Vendor': np.where(first, 'Maktabakw', ''),
+        'Product Category': np.where(first, np.where(product % 3 == 0, 'Art', 'Stationery'), ''),
+        'Tags': np.where(first, 'bench', ''),
+        'Variant Barcode': barcodes.where(has_barcode, ''),
+        'Variant Price': rng.uniform(0.5, 50, rows).round(3),
+        'Variant Compare At Price': '',
+        'Variant Grams': rng.integers(10, 2000, rows),
+        'Variant Inventory Qty': rng.integers(0, 100, rows),
+        'Variant Requires Shipping': 'true',
+        'Variant Taxable': 'true',
+        'Image Src': np.where(with_image, image_base_url + '/img/' + ids + '.jpg', ''),
+        'Status': np.where(first & (rng.random(rows) < 0.05), 'draft', np.where(first, 'active', '')),
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    """Local CDN (GET /img/...) and translation endpoint (POST /translate)
+
+    Every request waits `latency` seconds, then a `throttle_rate` fraction
+    get 429 with Retry-After and an `error_rate` fraction get 500.
+    """
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    error_rate = 0.0
+    throttle_rate = 0.0
+    _random = random.Random(0)
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/octet-stream', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fault(self):
+        if self.latency:
+            time.sleep(self.latency)
+        roll = self._random.random()
+        if roll < self.throttle_rate:
+            self._send(429, headers={'Retry-After': '1'})
+            return True
+        if roll < self.throttle_rate + self.error_rate:
+            self._send(500)
+            return True
+        return False
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if not path.startswith('/img/'):
+            self._send(404)
+            return
+        if self._fault():
+            return
+        self._send(200, JPEG_STUB + path.encode(), 'image/jpeg', {'ETag': f'"{path}"'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        if urlparse(self.path).path != '/translate':
+            self._send(404)
+            return
+        if self._fault():
+            return
+        text = parse_qs(body).get('q', [''])[0]
+        translated = '\n'.join(f'ترجمة {line}' for line in text.split('\n'))
+        self._send(200, json.dumps([[[translated, text, None, None]]]).encode('utf-8'), 'application/json')
+
+
+@contextlib.contextmanager
+def local_servers(latency=0.0, error_rate=0.0, throttle_rate=0.0):
+    """Run the CDN / translation stand-in; yields its base URL"""
+    handler = type('Handler', (BenchHandler,), {
+        'latency': latency, 'error_rate': error_rate, 'throttle_rate': throttle_rate})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# File each target reads its export from; written by synthetic_export before
+# the timer starts so only the script under test is timed.
+TARGET_INPUTS = {
+    'process_unique_products': '265.csv',
+    'brand_ingest': 'bench.csv',
+    'create_talabat_csv': 'products_export.csv',
+}
+
+
+def run_target(target, export, export_file, base_url, rate_limit, max_translations):
+    """Run one target inside the current (scratch) directory
+
+    `export_file` already holds `export` as CSV (see TARGET_INPUTS).
+    Returns the number of items it handled (rows, images or titles).
+    """
+    if target == 'process_unique_products':
+        import process_unique_products
+        process_unique_products.main(export_file)
+        return len(export)
+    elif target == 'brand_ingest':
+        from brand_ingest import ingest_brand
+        ingest_brand('bench', {
+            'display_name': 'Bench', 'input_csv': export_file, 'output_dir': 'bench_brand',
+            'excel_name': 'bench_products.xlsx', 'arabic_prefix': 'بنش', 'barcode_policy': 'existing',
+            'image_extensions': ['.png'], 'rate_limit': rate_limit,
+        })
+        return len(export)
+    elif target == 'create_talabat_csv':
+        import create_talabat_csv
+        create_talabat_csv.main(rate_limit=rate_limit)
+        return len(export)
+    elif target == 'downloader':
+        from image_downloader import download_images
+        from image_store import ImageStore
+        Path('bench_images').mkdir(exist_ok=True)
+        urls = [url for url in export['Image Src'] if url]
+        jobs = [(url, Path('bench_images') / f'{i}.jpg') for i, url in enumerate(urls)]
+        download_images(jobs, rate_limit=rate_limit, store=ImageStore('bench_store'))
+        return len(jobs)
+    elif target == 'translator':
+        from translate_to_arabic import translate_many
+        from translation_cache import TranslationCache
+        titles = export['Title'][export['Title'] != ''].str.split('||', regex=False).str[0].head(max_translations)
+        with TranslationCache('bench_translations.sqlite') as cache:
+            translations = translate_many(titles, cache=cache, url=base_url + '/translate')
+        if not translations:
+            raise RuntimeError(f"translator translated none of {len(titles)} titles")
+        return len(translations)
+    raise ValueError(f"unknown target {target!r}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(results_file):
+    previous = {}
+    if results_file.exists():
+        with open(results_file, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                previous[record['key']] = record
+    return previous
+
+
+def compare(before, seconds, min_seconds=REGRESSION_MIN_SECONDS):
+    """' +12% vs abc123' style note against the previous result, flagging regressions"""
+    if not before:
+        return ''
+    ratio = seconds / before['seconds']
+    regressed = ratio > REGRESSION_THRESHOLD and seconds - before['seconds'] > min_seconds
+    flag = '⚠️  REGRESSION ' if regressed else ''
+    return f"  {flag}{(ratio - 1) * 100:+.0f}% vs {before['commit'] or 'previous'}"
+
+
+def run_benchmarks(sizes, targets, latency=0.0, error_rate=0.0, throttle_rate=0.0, rate_limit=0.0,
+                   max_images=500, max_translations=2000, results_file=RESULTS_FILE, verbose=False):
+    """Time every target at every size and append the results to `results_file`"""
+    results_file = Path(results_file).absolute()
+    previous = previous_results(results_file)
+    commit = git_commit()
+    records = []
+    original_dir = os.getcwd()
+    with local_servers(latency, error_rate, throttle_rate) as base_url:
+        for size in sizes:
+            rows = SIZES[size]
+            for target in targets:
+                with tempfile.TemporaryDirectory(prefix='bench-') as scratch:
+                    os.chdir(scratch)
+                    try:
+                        export_file = TARGET_INPUTS.get(target, 'export.csv')
+                        export = synthetic_export(export_file, rows, base_url, max_images)
+                        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                        start = time.perf_counter()
+                        with quiet:
+                            items = run_target(target, export, export_file, base_url, rate_limit, max_translations)
+                        seconds = time.perf_counter() - start
+                    finally:
+                        os.chdir(original_dir)
+
+                settings = {'latency': latency, 'error_rate': error_rate, 'throttle_rate': throttle_rate,
+                            'rate_limit': rate_limit, 'max_images': max_images,
+                            'max_translations': max_translations}
+                key = f"{target}:{size}:" + ','.join(f'{k}={v}' for k, v in sorted(settings.items()))
+                record = {'ts': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit, 'key': key,
+                          'target': target, 'size': size, 'rows': rows, 'items': items,
+                          'seconds': round(seconds, 3), 'items_per_second': round(items / seconds, 1), **settings}
+                change = compare(previous.get(key), seconds)
+                print(f"⏱️  {target:<24} {size:>5}  {items:8} items  {seconds:8.2f}s  {items / seconds:10.0f}/s{change}")
+                records.append(record)
+                with open(results_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return records
+
+
+def run_startup_benchmark(runs=STARTUP_RUNS, results_file=RESULTS_FILE):
+    """Time `talabat` CLI startup against a small Crayola project
+
+    Each command is run once untimed (summary fills its cache) and then
+    `runs` times; the median is recorded. A run under -X importtime tells
+    whether the command imported pandas, which the quick commands should not.
+    """
+    results_file = Path(results_file).absolute()
+    previous = previous_results(results_file)
+    commit = git_commit()
+    cli = Path(__file__).absolute().with_name('talabat.py')
+    records = []
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench-') as scratch:
+        os.chdir(scratch)
+        try:
+            with local_servers() as base_url, contextlib.redirect_stdout(io.StringIO()):
+                from brand_ingest import ingest_brand
+                from brands import BRANDS
+                synthetic_export(BRANDS['crayola']['input_csv'], 1000, base_url, 200)
+                ingest_brand('crayola', dict(BRANDS['crayola'], rate_limit=0))
+            for name, argv in STARTUP_COMMANDS.items():
+                command = [sys.executable, str(cli), *argv]
+                subprocess.run(command, capture_output=True, check=True)
+                times = []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    subprocess.run(command, capture_output=True, check=True)
+                    times.append(time.perf_counter() - start)
+                imports = subprocess.run([sys.executable, '-X', 'importtime', *command[1:]], capture_output=True,
+                                         text=True, check=True).stderr
+                pandas = any(line.rstrip().endswith('| pandas') for line in imports.splitlines())
+                seconds = statistics.median(times)
+
+                key = f"startup:{name}:runs={runs}"
+                record = {'ts': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit, 'key': key,
+                          'target': 'startup', 'command': 'talabat ' + shlex.join(argv), 'runs': runs,
+                          'seconds': round(seconds, 4), 'imports_pandas': pandas}
+                change = compare(previous.get(key), seconds, STARTUP_REGRESSION_MIN_SECONDS)
+                budget = '  ⚠️  OVER BUDGET' if name == 'help' and seconds > STARTUP_BUDGET else ''
+                note = '  (imports pandas)' if pandas else ''
+                print(f"⏱️  {record['command']:<34} {seconds * 1000:8.1f}ms{note}{budget}{change}")
+                records.append(record)
+                with open(results_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        finally:
+            os.chdir(original_dir)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks on synthetic Shopify exports")
+    parser.add_argument('--sizes', default='1k', help=f"Comma-separated sizes from {', '.join(SIZES)}")
+    parser.add_argument('--targets', default=','.join(TARGETS), help="Comma-separated targets")
+    parser.add_argument('--latency', type=float, default=0.0, help="Server latency per request (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Client requests/s per host (0 = unlimited)")
+    parser.add_argument('--max-images', type=int, default=500, help="Products with an image URL")
+    parser.add_argument('--max-translations', type=int, default=2000, help="Titles sent to the translator")
+    parser.add_argument('--results', default=str(RESULTS_FILE), help="JSON lines file results are appended to")
+    parser.add_argument('--verbose', action='store_true', help="Show the scripts' own output")
+    parser.add_argument('--startup', action='store_true',
+                        help="Time `talabat` CLI startup instead of the pipeline targets")
+    args = parser.parse_args()
+
+    if args.startup:
+        run_startup_benchmark(results_file=args.results)
+    else:
+        sizes = args.sizes.split(',')
+        targets = args.targets.split(',')
+        unknown = (set(sizes) - set(SIZES)) | (set(targets) - set(TARGETS))
+        if unknown:
+            parser.error(f"unknown size(s)/target(s): {', '.join(sorted(unknown))}")
+        run_benchmarks(sizes, targets, args.latency, args.error_rate, args.throttle_rate, args.rate_limit,
+                       args.max_images, args.max_translations, args.results, args.verbose)
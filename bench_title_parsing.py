@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from process_unique_products import extract_titles_from_combined
+import title_parsing
+from title_parsing import split_titles
+
+
+def clean_title(title):
+    """Per-row English title split formerly used by the brand scripts"""
+    if '||' in title:
+        return title.split('||')[0].strip()
+    return title.strip()
+
+
+def extract_arabic_title(title, prefix='كرايولا'):
+    """Per-row Arabic title split formerly used by the brand scripts"""
+    if '||' in title:
+        return title.split('||')[1].strip()
+    return f"{prefix} {title}"
+
+
+def make_titles(count, seed=42):
+    """Synthetic Shopify titles: mostly "English || Arabic", some English-only
+    or Arabic-only, a few missing"""
+    rng = random.Random(seed)
+    titles = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            titles.append(f"Crayola Washable Markers {i} Pack || أقلام تلوين كرايولا {i} قطعة")
+        elif kind < 0.85:
+            titles.append(f"Deli Stapler No.{i} Heavy Duty")
+        elif kind < 0.98:
+            titles.append(f"دفتر ملاحظات {i}")
+        else:
+            titles.append(None)
+    return pd.Series(titles, dtype=object)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(rows):
+    titles = make_titles(rows)
+    brand_titles = pd.Series([str(title) for title in titles], dtype=object)
+
+    results = [
+        ('per-row extract_titles_from_combined',
+         timed(lambda: [extract_titles_from_combined(t) for t in titles])),
+        ('vectorized split_titles', timed(lambda: split_titles(titles))),
+        ('vectorized split_titles (pandas fallback)',
+         timed(lambda: title_parsing._split_pandas(titles, None))),
+        ('per-row clean_title + extract_arabic_title',
+         timed(lambda: [(clean_title(t), extract_arabic_title(t)) for t in brand_titles])),
+        ('vectorized split_titles (brand prefix)',
+         timed(lambda: split_titles(brand_titles, 'كرايولا'))),
+    ]
+    if title_parsing.pa is not None:
+        # What read_csv(..., dtype_backend='pyarrow') hands over: no conversion cost
+        arrow_titles = titles.astype('string[pyarrow]')
+        results.insert(2, ('vectorized split_titles (Arrow-backed input)',
+                           timed(lambda: split_titles(arrow_titles))))
+
+    print(f"Title parsing benchmark ({rows:,} rows)")
+    print("-" * 100)
+    for name, seconds in results:
+        per_million = seconds * 1_000_000 / rows
+        print(f"{name:<48} {seconds:8.3f}s  {per_million:7.2f}s/M rows  {rows / seconds:12,.0f} rows/s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark per-row vs vectorized title parsing")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.rows)
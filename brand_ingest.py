@@ -0,0 +1,153 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from barcode_registry import barcodes_for_keys, register_barcodes
+from brands import BRANDS
+from catalog_store import save_catalog
+from image_downloader import download_images, FAILED
+from metrics import metrics
+from product_dedup import apply_merge_decisions, find_duplicates
+from shopify_export import ShopifyExport, products_frame
+from title_parsing import split_titles
+
+
+def assign_barcodes(raw_barcodes, keys, policy, project):
+    """Keep or generate barcodes according to the brand's barcode policy
+
+    Kept barcodes are recorded in the shared registry and new ones are
+    allocated from it, so no two products in any project share a barcode.
+    Generated barcodes are assigned per product key (the Handle), so a
+    product keeps its barcode when the brand is ingested again.
+    """
+    # Clean barcode (remove quotes if present)
+    barcodes = raw_barcodes.fillna('').astype(str).str.replace("'", '', regex=False).str.replace('"', '', regex=False)
+    if policy == 'generate':
+        missing = pd.Series(True, index=barcodes.index)
+    else:
+        missing = barcodes.eq('') | barcodes.eq('nan')
+    barcodes = barcodes.astype(object)
+    register_barcodes(barcodes[~missing], project=project)
+    barcodes[missing] = barcodes_for_keys(keys[missing], project=project)
+    return barcodes
+
+
+def image_extensions(urls, extensions):
+    """Pick the image file extension from the URL (defaults to .jpg)"""
+    lowered = urls.str.lower()
+    conditions = [lowered.str.contains('.jpg', regex=False) | lowered.str.contains('.jpeg', regex=False)]
+    choices = ['.jpg']
+    for ext in extensions:
+        conditions.append(lowered.str.contains(ext, regex=False))
+        choices.append(ext)
+    return pd.Series(np.select(conditions, choices, default='.jpg'), index=urls.index)
+
+
+def build_products(df_unique, config):
+    """Turn a brand's products (one row per Handle, see
+    shopify_export.products_frame) into the product frame and image jobs"""
+    if config.get('dedup'):
+        decisions = find_duplicates(df_unique)
+        df_unique = apply_merge_decisions(df_unique, decisions)
+        print(f"🔁 Merged {len(decisions)} near-duplicate products")
+
+    titles = df_unique['Title'].astype(str)
+    english, arabic = split_titles(titles, config['arabic_prefix'])
+    barcodes = assign_barcodes(df_unique['Variant Barcode'], df_unique['Handle'], config['barcode_policy'],
+                               config['output_dir'])
+
+    products = pd.DataFrame({
+        'english_name': english,
+        'arabic_name': arabic,
+        'barcode': barcodes,
+        'price': pd.to_numeric(df_unique['Variant Price'], errors='coerce'),
+    }).reset_index(drop=True)
+
+    urls = df_unique['Image Src'].fillna('').astype(str)
+    has_image = urls.str.startswith('http')
+    urls = urls[has_image]
+    filenames = barcodes[has_image].astype(str) + image_extensions(urls, config['image_extensions'])
+    images_dir = Path(config['output_dir']) / 'images'
+    image_jobs = [(url, images_dir / filename) for url, filename in zip(urls, filenames)]
+
+    return products, image_jobs
+
+
+def ingest_brand(brand, config=None):
+    """Process a brand's CSV and create its Excel file with images"""
+    config = config or BRANDS[brand]
+    name = config['display_name']
+    brand_dir = Path(config['output_dir'])
+    images_dir = brand_dir / 'images'
+
+    # Create directories if they don't exist
+    brand_dir.mkdir(exist_ok=True)
+    images_dir.mkdir(exist_ok=True)
+
+    # Read the CSV file
+    print(f"📖 Reading {config['input_csv']}...")
+    export = ShopifyExport(config['input_csv'])
+    df = products_frame(list(export.products()))
+
+    print(f"📊 Found {export.rows_read} rows in {config['input_csv']}")
+    for column, count in export.text_changes.most_common():
+        print(f"🧹 {column}: cleaned HTML/entities in {count} cells")
+
+    df_final, image_jobs = build_products(df, config)
+    print(f"✅ Found {len(df_final)} unique products")
+
+    # Download all images concurrently (rate limited per host)
+    done = 0
+
+    def report(url, image_path, status):
+        nonlocal done
+        done += 1
+        if status == FAILED:
+            print(f"❌ Failed to download: {Path(image_path).name}")
+        metrics.progress(f"{name} images", done, len(image_jobs))
+
+    results = download_images(image_jobs, rate_limit=config.get('rate_limit', 4.0), on_result=report)
+    downloaded_images = sum(1 for status in results.values() if status != FAILED)
+
+    # Save to Excel
+    excel_file = brand_dir / config['excel_name']
+    save_catalog(df_final, excel_file)
+
+    print(f"✅ Created {config['excel_name']} with {len(df_final)} products")
+    print(f"✅ Downloaded {downloaded_images} images to {images_dir.as_posix()}/")
+
+    # Create download summary
+    summary_file = images_dir / 'download_summary.txt'
+    heading = f"{name} Products Download Summary"
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        f.write(f"{heading}\n")
+        f.write(f"{'=' * len(heading)}\n")
+        f.write(f"Total products: {len(df_final)}\n")
+        f.write(f"Images downloaded: {downloaded_images}\n")
+        f.write(f"Download date: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+    # Show sample of processed data
+    print("\n📋 Sample of processed products:")
+    for i, product in enumerate(df_final.head(5).itertuples(index=False)):
+        print(f"{i+1}. {product.english_name} - {product.price} - {product.barcode}")
+
+    return df_final
+
+
+def ingest_brands(brands=()):
+    """ingest_brand for each of `brands` (default: every brand in BRANDS)"""
+    for brand in brands or sorted(BRANDS):
+        ingest_brand(brand)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a brand's Shopify export")
+    parser.add_argument('brands', nargs='*', help=f"Brands to process (default: all of {', '.join(sorted(BRANDS))})")
+    args = parser.parse_args()
+    unknown = set(args.brands) - set(BRANDS)
+    if unknown:
+        parser.error(f"unknown brand(s): {', '.join(sorted(unknown))}")
+    ingest_brands(args.brands)
@@ -0,0 +1,30 @@
+# One entry per brand project. Onboarding a new brand only needs a new entry:
+#   input_csv        Shopify export for the brand
+#   output_dir       project folder (Excel file + images/)
+#   excel_name       output workbook inside output_dir
+#   arabic_prefix    prepended to the title when it has no "|| Arabic" part
+#   barcode_policy   'existing' keeps Variant Barcode and only generates missing
+#                    ones, 'generate' assigns a new barcode to every product
+#   image_extensions extensions recognised in the image URL besides .jpg
+#   rate_limit       optional, image requests per second against the CDN (default 4)
+#   dedup            optional, also merge near-duplicate products (product_dedup.py)
+BRANDS = {
+    'crayola': {
+        'display_name': 'Crayola',
+        'input_csv': 'crayola.csv',
+        'output_dir': 'crayola',
+        'excel_name': 'crayola_products.xlsx',
+        'arabic_prefix': 'كرايولا',
+        'barcode_policy': 'existing',
+        'image_extensions': ['.png'],
+    },
+    'deli': {
+        'display_name': 'Deli',
+        'input_csv': 'deli.csv',
+        'output_dir': 'deli',
+        'excel_name': 'deli_products.xlsx',
+        'arabic_prefix': 'ديلي',
+        'barcode_policy': 'existing',
+        'image_extensions': ['.png', '.webp'],
+    },
+}
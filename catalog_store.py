@@ -0,0 +1,99 @@
+import importlib.util
+import os
+from pathlib import Path
+
+# pandas (and excel_io, which needs it) is imported by the functions that
+# load or save whole catalogs, so catalog_exists / read_catalog_columns stay
+# cheap for the quick `talabat summary` / `talabat check` commands
+
+# Parquet needs pyarrow; without it the catalog falls back to the .xlsx files
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+
+def catalog_path(excel_file):
+    """Parquet file holding the catalog exported to `excel_file`"""
+    excel_file = Path(excel_file)
+    return excel_file.with_suffix('.parquet')
+
+
+def _is_current(parquet_file, excel_file):
+    """True if the Parquet copy exists and the workbook was not edited after it"""
+    if not parquet_file.exists():
+        return False
+    return not excel_file.exists() or excel_file.stat().st_mtime <= parquet_file.stat().st_mtime
+
+
+def _write_parquet(df, parquet_file):
+    from excel_io import BARCODE_COLUMNS
+    df = df.copy()
+    for column in df.columns:
+        if column in BARCODE_COLUMNS:
+            df[column] = df[column].astype('string')
+    temp_path = parquet_file.with_name(f".{parquet_file.name}.tmp")
+    try:
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, parquet_file)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def load_catalog(excel_file):
+    """Load a product catalog, preferring its Parquet copy
+
+    The Parquet file next to the workbook is the source of truth. The
+    workbook is only read when there is no Parquet copy yet or it was
+    edited by hand after the last save; it is then imported once.
+    """
+    import pandas as pd
+    from excel_io import read_excel
+    excel_file = Path(excel_file)
+    parquet_file = catalog_path(excel_file)
+    if HAS_PARQUET and _is_current(parquet_file, excel_file):
+        return pd.read_parquet(parquet_file)
+    df = read_excel(excel_file)
+    if HAS_PARQUET:
+        _write_parquet(df, parquet_file)
+    return df
+
+
+def read_catalog_columns(excel_file, columns):
+    """{column: list of values} for the given catalog columns, or all of them
+    if `columns` is None (None for empty cells, columns the catalog lacks
+    are left out)
+
+    Reads the Parquet copy with pyarrow alone when it is current, which is
+    much faster to start than pandas; otherwise falls back to load_catalog.
+    """
+    excel_file = Path(excel_file)
+    parquet_file = catalog_path(excel_file)
+    if HAS_PARQUET and _is_current(parquet_file, excel_file):
+        # ParquetFile, not read_table: the dataset layer behind read_table imports pandas
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(parquet_file)
+        if columns is not None:
+            columns = [column for column in columns if column in parquet.schema_arrow.names]
+        return parquet.read(columns=columns).to_pydict()
+    df = load_catalog(excel_file)
+    return {column: df[column].astype(object).where(df[column].notna(), None).tolist()
+            for column in (df.columns if columns is None else columns) if column in df.columns}
+
+
+def save_catalog(df, excel_file, export=True):
+    """Save a product catalog to Parquet, exporting the .xlsx deliverable too
+
+    With export=False only the Parquet copy is written (for intermediate
+    steps); the workbook is then stale until the next export.
+    """
+    from excel_io import write_excel
+    excel_file = Path(excel_file)
+    if export or not HAS_PARQUET:
+        write_excel(df, excel_file)
+    # Written after the workbook so the workbook does not look hand-edited
+    if HAS_PARQUET:
+        _write_parquet(df, catalog_path(excel_file))
+
+
+def catalog_exists(excel_file):
+    excel_file = Path(excel_file)
+    return excel_file.exists() or (HAS_PARQUET and catalog_path(excel_file).exists())
@@ -1,8 +1,15 @@
-import pandas as pd
+import math
 from pathlib import Path
 
+from catalog_store import catalog_exists, read_catalog_columns
+from image_manifest import load_manifest
+
 def check_crayola_project():
-    """Check the Crayola project for completeness"""
+    """Check the Crayola project for completeness
+
+    Works on plain column lists (see read_catalog_columns), so with a
+    Parquet catalog the check runs without importing pandas.
+    """
     crayola_dir = Path('crayola')
     excel_file = crayola_dir / 'crayola_products.xlsx'
     images_dir = crayola_dir / 'images'
@@ -10,41 +17,44 @@ def check_crayola_project():
     print("🔍 Checking Crayola project...")
     
     # Check if Excel file exists
-    if not excel_file.exists():
+    if not catalog_exists(excel_file):
         print("❌ crayola_products.xlsx not found!")
         return
     
     # Load data
-    df = pd.read_excel(excel_file)
-    print(f"✅ Excel file found with {len(df)} products")
+    columns = read_catalog_columns(excel_file, None)
+    products = len(columns['barcode'])
+    print(f"✅ Excel file found with {products} products")
     
     # Check columns
-    print(f"📋 Columns: {df.columns.tolist()}")
+    print(f"📋 Columns: {list(columns)}")
     
     # Check barcodes
     print(f"\n📊 Barcode analysis:")
-    existing_barcodes = df[df['barcode'].astype(str).str.startswith('07')]
-    generated_barcodes = df[df['barcode'].astype(str).str.startswith('01')]
+    barcodes = [str(barcode) if barcode is not None else None for barcode in columns['barcode']]
+    existing_barcodes = [i for i, barcode in enumerate(barcodes) if barcode and barcode.startswith('07')]
+    generated_barcodes = [i for i, barcode in enumerate(barcodes) if barcode and barcode.startswith('01')]
     
     print(f"   - Products with existing barcodes: {len(existing_barcodes)}")
     print(f"   - Products with generated barcodes: {len(generated_barcodes)}")
     
     # Check prices
+    prices = [price for price in columns['price'] if price is not None and not math.isnan(price)]
     print(f"\n💰 Price analysis:")
-    print(f"   - Price range: {df['price'].min():.2f} - {df['price'].max():.2f}")
-    print(f"   - Average price: {df['price'].mean():.2f}")
+    if prices:
+        print(f"   - Price range: {min(prices):.2f} - {max(prices):.2f}")
+        print(f"   - Average price: {math.fsum(prices) / len(prices):.2f}")
     
     # Check images
     if images_dir.exists():
-        image_files = list(images_dir.glob('*.jpg')) + list(images_dir.glob('*.png'))
+        image_barcodes = load_manifest(images_dir).barcodes(('.jpg', '.png'))
         print(f"\n🖼️  Image analysis:")
-        print(f"   - Images downloaded: {len(image_files)}")
-        print(f"   - Products: {len(df)}")
-        print(f"   - Image coverage: {len(image_files)/len(df)*100:.1f}%")
+        print(f"   - Images downloaded: {len(image_barcodes)}")
+        print(f"   - Products: {products}")
+        print(f"   - Image coverage: {len(image_barcodes)/products*100:.1f}%")
         
         # Check for missing images
-        barcodes_in_excel = set(df['barcode'].astype(str))
-        image_barcodes = set([f.stem for f in image_files])
+        barcodes_in_excel = set(barcodes) - {None}
         missing_images = barcodes_in_excel - image_barcodes
         
         if missing_images:
@@ -56,10 +66,10 @@ def check_crayola_project():
     
     # Check for empty values
     print(f"\n🔍 Data quality check:")
-    empty_english = df['english_name'].isna().sum()
-    empty_arabic = df['arabic_name'].isna().sum()
-    empty_barcode = df['barcode'].isna().sum()
-    empty_price = df['price'].isna().sum()
+    empty_english = columns['english_name'].count(None)
+    empty_arabic = columns['arabic_name'].count(None)
+    empty_barcode = barcodes.count(None)
+    empty_price = products - len(prices)
     
     print(f"   - Empty English names: {empty_english}")
     print(f"   - Empty Arabic names: {empty_arabic}")
@@ -67,13 +77,12 @@ def check_crayola_project():
     print(f"   - Empty prices: {empty_price}")
     
     # Show sample of existing barcodes
-    if len(existing_barcodes) > 0:
+    if existing_barcodes:
         print(f"\n📋 Sample products with existing barcodes:")
-        for idx, row in existing_barcodes.head(5).iterrows():
-            print(f"   - {row['english_name']} (Barcode: {row['barcode']})")
+        for i in existing_barcodes[:5]:
+            print(f"   - {columns['english_name'][i]} (Barcode: {barcodes[i]})")
     
     print(f"\n✅ Crayola project check complete!")
 
 if __name__ == "__main__":
     check_crayola_project()
-
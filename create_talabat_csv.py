@@ -1,45 +1,165 @@
+import argparse
+import numpy as np
 import pandas as pd
-import os
-import requests
+from collections import Counter
 from pathlib import Path
 import shutil
-import random
-
-def generate_new_barcode():
-    """Generate a new unique barcode starting with 69 (common for Kuwait)"""
-    # Start with 69 (Kuwait country code)
-    prefix = "69"
-    # Generate 11 random digits
-    middle = ''.join([str(random.randint(0, 9)) for _ in range(11)])
-    # Calculate check digit (simplified)
-    check_digit = str(random.randint(0, 9))
-    return prefix + middle + check_digit
-
-def download_image(url, filepath):
-    """Download image from URL and save to filepath"""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        return True
-    except Exception as e:
-        print(f"❌ Failed to download {url}: {e}")
-        return False
 
-def main():
-    print("🚀 Creating Talabat CSV with new barcodes and organized images...")
+from barcode_registry import EAN_13, barcodes_for_keys
+from image_downloader import download_images, FAILED
+from image_manifest import load_manifest
+from shopify_export import DEFAULT_CHUNKSIZE, ShopifyExport
+from title_parsing import split_titles
+
+# Characters that are not allowed in file names
+FILENAME_UNSAFE = str.maketrans({char: '_' for char in '/\\:*?"<>|'})
+
+# Image downloads queued ahead of the CSV writer; the export is read and
+# transformed only as fast as this allows
+MAX_PENDING_DOWNLOADS = 2000
+
+def write_placeholder(images_dir, barcode):
+    """Create a placeholder file for a product without a usable image"""
+    image_filename = f"{barcode}_placeholder.jpg"
+    # Create a simple placeholder image (you can replace this with a default image)
+    if not (images_dir / image_filename).exists():
+        with open(images_dir / image_filename, 'w') as f:
+            f.write(f"Placeholder for {barcode}")
+    return image_filename
+
+def transform_chunk(chunk):
+    """Build Talabat rows for a chunk of active products
+
+    Returns the Talabat frame plus the image URL for each row ('' when the
+    product has no image).
+    """
+    # Get product title (clean it for filename)
+    english, _ = split_titles(chunk['Title'])
+    titles = english.astype(object).str.translate(FILENAME_UNSAFE)
+    
+    # EAN-13 barcodes starting with 69 (Kuwait format); a Handle keeps the
+    # barcode it was given on earlier runs, new Handles get new ones. The
+    # export has one row per Handle here, so the Handle is the variant key.
+    barcodes = barcodes_for_keys(chunk['Handle'], project='new_items', **EAN_13)
+    
+    # Image filename: barcode plus an extension guessed from the URL
+    image_urls = chunk['Image Src'].fillna('')
+    lowered = image_urls.str.lower()
+    extensions = np.select([lowered.str.contains('.png', regex=False),
+                            lowered.str.contains('.jpeg', regex=False)],
+                           ['.png', '.jpeg'], default='.jpg')
+    image_filenames = np.where(image_urls != '',
+                               pd.Series(barcodes, index=chunk.index) + extensions,
+                               pd.Series(barcodes, index=chunk.index) + '_placeholder.jpg')
+    
+    def number(column, default):
+        return pd.to_numeric(chunk[column], errors='coerce').fillna(default)
+    
+    # Body (HTML) is plain text already (tags and entities are stripped on read)
+    description = chunk['Body (HTML)'].fillna('')
+    
+    # Prepare data for Talabat CSV
+    talabat_df = pd.DataFrame({
+        'Barcode': barcodes,
+        'Title': titles.values,
+        'Description': description.values,
+        'Category': chunk['Product Category'].fillna('General').values,
+        'Price': number('Variant Price', 0.0).astype(float).values,
+        'Compare Price': number('Variant Compare At Price', 0.0).astype(float).values,
+        'Weight (g)': number('Variant Grams', 0.0).astype(float).values,
+        'Image Filename': image_filenames,
+        'Tags': chunk['Tags'].fillna('').values,
+        'Vendor': chunk['Vendor'].fillna('Maktabakw').values,
+        'Inventory Qty': number('Variant Inventory Qty', 0).astype(int).values,
+        'Requires Shipping': chunk['Variant Requires Shipping'].fillna('true').values,
+        'Taxable': chunk['Variant Taxable'].fillna('true').values,
+    })
+    return talabat_df, image_urls.values
+
+class ChunkWriter:
+    """Appends transformed chunks to the Talabat CSV once their images are in
+
+    A chunk is held until every one of its downloads has finished (a failed
+    download turns its row into a placeholder) and chunks are written in
+    the order they were read. Running totals are kept for the summary.
+    """
+
+    def __init__(self, csv_path, images_dir):
+        self.csv_path = csv_path
+        self.images_dir = images_dir
+        self.chunks = {}
+        self.next_chunk = 0
+        self.total_products = 0
+        self.downloaded_count = 0
+        self.kept_count = 0
+        self.placeholder_count = 0
+        self.image_files = set()
+        self.categories = Counter()
+        self.price_min, self.price_max, self.price_sum = float('inf'), float('-inf'), 0.0
+
+    def add(self, number, talabat_df, downloads):
+        self.chunks[number] = [talabat_df, downloads]
+        self.flush()
+
+    def image_done(self, number, position, failed):
+        chunk = self.chunks[number]
+        if failed:
+            barcode = chunk[0].at[position, 'Barcode']
+            chunk[0].at[position, 'Image Filename'] = write_placeholder(self.images_dir, barcode)
+            self.placeholder_count += 1
+        else:
+            self.downloaded_count += 1
+        chunk[1] -= 1
+        self.flush()
+
+    def flush(self):
+        while self.next_chunk in self.chunks and self.chunks[self.next_chunk][1] == 0:
+            talabat_df, _ = self.chunks.pop(self.next_chunk)
+            self.next_chunk += 1
+            first_chunk = self.total_products == 0
+            talabat_df.to_csv(self.csv_path, index=False, mode='w' if first_chunk else 'a',
+                              header=first_chunk, encoding='utf-8-sig' if first_chunk else 'utf-8')
+            
+            self.total_products += len(talabat_df)
+            self.image_files.update(talabat_df['Image Filename'])
+            self.categories.update(talabat_df['Category'])
+            self.price_min = min(self.price_min, talabat_df['Price'].min())
+            self.price_max = max(self.price_max, talabat_df['Price'].max())
+            self.price_sum += talabat_df['Price'].sum()
+            print(f"  📊 {self.total_products} products written ({self.downloaded_count} images downloaded, "
+                  f"{self.kept_count} unchanged, {self.placeholder_count} placeholders)")
+
+def remove_stale_images(images_dir, keep):
+    """Delete images and placeholders that no product in `keep` uses any more
+    (products gone from the export, placeholders replaced by a real image)"""
+    manifest = load_manifest(images_dir)
+    placeholders = {path.name for path in images_dir.glob('*_placeholder.jpg')}
+    stale = sorted((set(manifest.entries) | placeholders) - set(keep))
+    for name in stale:
+        (images_dir / name).unlink(missing_ok=True)
+        manifest.discard(name)
+    manifest.save()
+    return len(stale)
+
+def main(chunksize=DEFAULT_CHUNKSIZE, rate_limit=4.0, max_pending=MAX_PENDING_DOWNLOADS, full=False):
+    """Build new_items/ from products_export.csv
+
+    Runs incrementally unless `full`: new_items/images is kept and only
+    images of new products, or products whose Image Src changed, are
+    downloaded (the folder manifest records each image's URL). Barcodes
+    are stable across runs either way.
+    """
+    print("🚀 Creating Talabat CSV with barcodes and organized images...")
     
     # Create new_items folder
     new_items_dir = Path('new_items')
-    if new_items_dir.exists():
+    if full and new_items_dir.exists():
         shutil.rmtree(new_items_dir)
-    new_items_dir.mkdir()
     
     # Create subdirectories
     images_dir = new_items_dir / 'images'
-    images_dir.mkdir()
+    images_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(images_dir)
     
     # Load the CSV file
     csv_file = Path('products_export.csv')
@@ -47,122 +167,117 @@ def main():
         print("❌ products_export.csv file not found!")
         return
     
-    df = pd.read_csv(csv_file)
-    print(f"✅ Loaded CSV with {len(df)} products")
-    
-    # Filter only active products
-    active_products = df[df['Status'] == 'active'].copy()
-    print(f"📊 Found {len(active_products)} active products")
-    
-    # Generate new barcodes and organize data
-    talabat_data = []
-    downloaded_images = []
+    talabat_csv_path = new_items_dir / 'talabat_products.csv'
+    writer = ChunkWriter(talabat_csv_path, images_dir)
+    export = ShopifyExport(csv_file, chunksize)
+    job_rows = {}
     
-    print(f"\n🔄 Processing products and generating new barcodes...")
+    print(f"\n🔄 Streaming active products in chunks of {chunksize} rows and assigning barcodes...")
     
-    for idx, row in active_products.iterrows():
-        # Generate new barcode
-        new_barcode = generate_new_barcode()
-        
-        # Get product title (clean it for filename)
-        title = str(row['Title']).split('||')[0].strip() if '||' in str(row['Title']) else str(row['Title'])
-        title = title.replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('?', '_').replace('"', '_').replace('<', '_').replace('>', '_').replace('|', '_')
+    def produce_jobs():
+        """Transform chunk after chunk, yielding image downloads as they come up
         
-        # Get image URL
-        image_url = str(row['Image Src']) if pd.notna(row['Image Src']) else None
-        
-        if image_url and image_url != 'nan':
-            # Download image with barcode as filename
-            image_extension = '.jpg'  # Default extension
-            if '.png' in image_url.lower():
-                image_extension = '.png'
-            elif '.jpeg' in image_url.lower():
-                image_extension = '.jpeg'
+        Runs on the main thread between download completions, so the next
+        chunk is transformed while earlier images are still downloading.
+        """
+        for number, chunk in enumerate(export.frames(active_only=True)):
+            talabat_df, image_urls = transform_chunk(chunk)
             
-            image_filename = f"{new_barcode}{image_extension}"
-            image_path = images_dir / image_filename
+            # No image URL: create placeholder
+            for barcode in talabat_df.loc[image_urls == '', 'Barcode']:
+                write_placeholder(images_dir, barcode)
+                writer.placeholder_count += 1
             
-            print(f"  📥 Downloading: {title[:50]}... → {image_filename}")
+            # Images already downloaded from the same URL are kept as they are
+            jobs = []
+            for position in np.flatnonzero(image_urls != ''):
+                image_path = images_dir / talabat_df.at[position, 'Image Filename']
+                entry = manifest.entries.get(image_path.name)
+                if entry and entry['url'] == image_urls[position] and image_path.exists():
+                    writer.kept_count += 1
+                    continue
+                if image_path.exists():
+                    image_path.unlink()
+                jobs.append((position, image_path))
             
-            if download_image(image_url, image_path):
-                downloaded_images.append(image_filename)
-            else:
-                # If download fails, create a placeholder
-                image_filename = f"{new_barcode}_placeholder.jpg"
-                image_path = images_dir / image_filename
-                # Create a simple placeholder image (you can replace this with a default image)
-                with open(image_path, 'w') as f:
-                    f.write(f"Placeholder for {new_barcode}")
-                downloaded_images.append(image_filename)
-        else:
-            # No image URL, create placeholder
-            image_filename = f"{new_barcode}_placeholder.jpg"
-            image_path = images_dir / image_filename
-            with open(image_path, 'w') as f:
-                f.write(f"Placeholder for {new_barcode}")
-            downloaded_images.append(image_filename)
-        
-        # Prepare data for Talabat CSV
-        talabat_row = {
-            'Barcode': new_barcode,
-            'Title': title,
-            'Description': str(row['Body (HTML)']).replace('<p>', '').replace('</p>', '').replace('<span>', '').replace('</span>', '') if pd.notna(row['Body (HTML)']) else '',
-            'Category': str(row['Product Category']) if pd.notna(row['Product Category']) else 'General',
-            'Price': float(row['Variant Price']) if pd.notna(row['Variant Price']) else 0.0,
-            'Compare Price': float(row['Variant Compare At Price']) if pd.notna(row['Variant Compare At Price']) else 0.0,
-            'Weight (g)': float(row['Variant Grams']) if pd.notna(row['Variant Grams']) else 0.0,
-            'Image Filename': image_filename,
-            'Tags': str(row['Tags']) if pd.notna(row['Tags']) else '',
-            'Vendor': str(row['Vendor']) if pd.notna(row['Vendor']) else 'Maktabakw',
-            'Inventory Qty': int(row['Variant Inventory Qty']) if pd.notna(row['Variant Inventory Qty']) else 0,
-            'Requires Shipping': str(row['Variant Requires Shipping']) if pd.notna(row['Variant Requires Shipping']) else 'true',
-            'Taxable': str(row['Variant Taxable']) if pd.notna(row['Variant Taxable']) else 'true'
-        }
-        
-        talabat_data.append(talabat_row)
+            writer.add(number, talabat_df, len(jobs))
+            for position, image_path in jobs:
+                job_rows[image_path] = (number, position)
+                yield image_urls[position], image_path
     
-    # Create Talabat CSV
-    talabat_df = pd.DataFrame(talabat_data)
-    talabat_csv_path = new_items_dir / 'talabat_products.csv'
-    talabat_df.to_csv(talabat_csv_path, index=False, encoding='utf-8-sig')
+    def report(url, image_path, status):
+        # Failures fall back to a placeholder
+        if status == FAILED:
+            print(f"❌ Failed to download {url}")
+        writer.image_done(*job_rows.pop(image_path), failed=status == FAILED)
+    
+    download_images(produce_jobs(), rate_limit=rate_limit, on_result=report, max_pending=max_pending)
+    
+    for column, count in export.text_changes.most_common():
+        print(f"🧹 {column}: cleaned HTML/entities in {count} cells")
+    
+    total_products = writer.total_products
+    downloaded_count = writer.downloaded_count
+    kept_count = writer.kept_count
+    placeholder_count = writer.placeholder_count
+    categories = writer.categories
+    price_min, price_max, price_sum = writer.price_min, writer.price_max, writer.price_sum
+    
+    if total_products == 0:
+        # Keep the images of the last run; an empty export is more likely
+        # truncated or mis-filtered than a shop with nothing left to sell
+        print("❌ No active products found!")
+        return
+    
+    removed_count = remove_stale_images(images_dir, writer.image_files)
     
     # Create summary report
     summary_path = new_items_dir / 'summary_report.txt'
     with open(summary_path, 'w', encoding='utf-8') as f:
         f.write("=== TALABAT PRODUCTS SUMMARY ===\n\n")
-        f.write(f"Total Products Processed: {len(talabat_data)}\n")
-        f.write(f"Images Downloaded: {len([img for img in downloaded_images if 'placeholder' not in img])}\n")
-        f.write(f"Placeholder Images: {len([img for img in downloaded_images if 'placeholder' in img])}\n")
+        f.write(f"Total Products Processed: {total_products}\n")
+        f.write(f"Images Downloaded: {downloaded_count}\n")
+        f.write(f"Images Unchanged Since Last Run: {kept_count}\n")
+        f.write(f"Images Removed (products gone): {removed_count}\n")
+        f.write(f"Placeholder Images: {placeholder_count}\n")
         f.write(f"CSV File: talabat_products.csv\n")
         f.write(f"Images Folder: images/\n\n")
         
         f.write("=== PRODUCT CATEGORIES ===\n")
-        categories = talabat_df['Category'].value_counts()
-        for category, count in categories.items():
+        for category, count in categories.most_common():
             f.write(f"{category}: {count} products\n")
         
         f.write(f"\n=== PRICE RANGE ===\n")
-        f.write(f"Min Price: {talabat_df['Price'].min():.2f} KWD\n")
-        f.write(f"Max Price: {talabat_df['Price'].max():.2f} KWD\n")
-        f.write(f"Average Price: {talabat_df['Price'].mean():.2f} KWD\n")
+        f.write(f"Min Price: {price_min:.2f} KWD\n")
+        f.write(f"Max Price: {price_max:.2f} KWD\n")
+        f.write(f"Average Price: {price_sum / total_products:.2f} KWD\n")
     
     print(f"\n✅ SUCCESS! Created Talabat-ready files in 'new_items' folder:")
     print(f"   📁 Folder: {new_items_dir}")
     print(f"   📊 CSV: {talabat_csv_path}")
-    print(f"   🖼️  Images: {images_dir} ({len(downloaded_images)} images)")
+    print(f"   🖼️  Images: {images_dir} ({downloaded_count + kept_count + placeholder_count} images)")
     print(f"   📋 Summary: {summary_path}")
     
     print(f"\n📊 Summary:")
-    print(f"   • Total Products: {len(talabat_data)}")
-    print(f"   • Images Downloaded: {len([img for img in downloaded_images if 'placeholder' not in img])}")
-    print(f"   • Placeholder Images: {len([img for img in downloaded_images if 'placeholder' in img])}")
+    print(f"   • Total Products: {total_products}")
+    print(f"   • Images Downloaded: {downloaded_count}")
+    print(f"   • Images Unchanged: {kept_count}")
+    print(f"   • Stale Images Removed: {removed_count}")
+    print(f"   • Placeholder Images: {placeholder_count}")
     print(f"   • All barcodes start with '69' (Kuwait format)")
     print(f"   • Image filenames match barcodes exactly")
     
     print(f"\n🚀 Ready to send to Talabat!")
-    print(f"   • CSV file contains all product data with new barcodes")
+    print(f"   • CSV file contains all product data with barcodes")
     print(f"   • Images folder contains all product images")
     print(f"   • Each image filename matches its product barcode")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Create the Talabat CSV from products_export.csv")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk (bounds peak memory)")
+    parser.add_argument('--rate-limit', type=float, default=4.0, help="Max image requests per second per host")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING_DOWNLOADS,
+                        help="Image downloads queued ahead of the CSV writer")
+    parser.add_argument('--full', action='store_true', help="Delete new_items/ and rebuild it from scratch")
+    args = parser.parse_args()
+    main(chunksize=args.chunksize, rate_limit=args.rate_limit, max_pending=args.max_pending, full=args.full)
@@ -1,46 +1,45 @@
+import argparse
 import pandas as pd
-import requests
-import os
-from urllib.parse import urlparse
-import time
 from pathlib import Path
 
-def get_file_extension(url):
-    """Get file extension from URL"""
-    parsed = urlparse(url)
-    path = parsed.path
-    if '.' in path:
-        return path.split('.')[-1].lower()
-    return 'jpg'  # Default extension
+from catalog_store import load_catalog
+from image_downloader import ImageDownloader, get_file_extension, FAILED
+from image_store import ImageStore
+from metrics import metrics
 
-def download_image(url, filename, max_retries=3):
-    """Download image from URL with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            
-            return True
-            
-        except Exception as e:
-            print(f"    Attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(2)  # Wait before retry
-    
-    return False
+IMAGES_DIR = Path('downloaded_images')
+
+def image_jobs(df, images_dir=IMAGES_DIR):
+    """Build (url, filename) download jobs for products with an image URL
+
+    Returns (jobs, number of products skipped for a missing URL or barcode).
+    """
+    jobs = []
+    skipped_count = 0
+    for image_url, barcode in zip(df['Image URL'], df['Barcode']):
+        if pd.isna(image_url) or pd.isna(barcode) or not image_url or not barcode:
+            skipped_count += 1
+            continue
+        
+        # Create filename using barcode
+        filename = images_dir / f"{barcode}.{get_file_extension(image_url)}"
+        jobs.append((image_url, filename))
+    return jobs, skipped_count
 
-def main():
+def download_product_images(df, images_dir=IMAGES_DIR, max_workers=8, rate_limit=4.0, refresh=False, on_result=None):
+    """Download the images of the products in `df`, named after their barcodes"""
+    images_dir.mkdir(exist_ok=True)
+    jobs, _ = image_jobs(df, images_dir)
+    with ImageDownloader(max_workers=max_workers, rate_limit=rate_limit, store=ImageStore(),
+                         revalidate=refresh) as downloader:
+        return downloader.download_all(jobs, on_result=on_result)
+
+def main(max_workers=8, rate_limit=4.0, refresh=False):
     print("Loading clean unique products from 265 test.xlsx...")
-    df = pd.read_excel('265 test.xlsx')
+    df = load_catalog('265 test.xlsx')
     
     # Create images directory
-    images_dir = Path('downloaded_images')
+    images_dir = IMAGES_DIR
     images_dir.mkdir(exist_ok=True)
     
     print(f"Found {len(df)} unique products")
@@ -52,66 +51,47 @@ def main():
     
     downloaded_count = 0
     failed_count = 0
-    skipped_count = 0
+    jobs, skipped_count = image_jobs(products_with_images, images_dir)
     
-    for idx, (_, row) in enumerate(products_with_images.iterrows()):
-        image_url = row['Image URL']
-        barcode = row['Barcode']
-        english_title = row['English Title'][:50] if row['English Title'] else "No Title"
-        
-        if not image_url or not barcode:
-            skipped_count += 1
-            continue
-        
-        print(f"\n[{idx + 1}/{len(products_with_images)}] Processing: {barcode}")
-        print(f"  Product: {english_title}")
-        
-        # Get file extension
-        extension = get_file_extension(image_url)
-        
-        # Create filename using barcode
-        filename = images_dir / f"{barcode}.{extension}"
-        
-        # Skip if file already exists
-        if filename.exists():
-            print(f"  ✓ File already exists: {filename}")
-            downloaded_count += 1
-            continue
-        
-        print(f"  Downloading: {image_url}")
-        print(f"  Saving as: {filename}")
-        
-        if download_image(image_url, filename):
-            print(f"  ✓ Downloaded successfully")
-            downloaded_count += 1
-        else:
-            print(f"  ✗ Failed to download")
+    print(f"Downloading {len(jobs)} images with {max_workers} workers ({rate_limit} req/s per host)...")
+    
+    done = 0
+    
+    def report(url, filename, status):
+        nonlocal done, downloaded_count, failed_count
+        done += 1
+        if status == FAILED:
+            print(f"  ✗ Failed to download: {url}")
             failed_count += 1
-        
-        # Small delay to be respectful to the server
-        time.sleep(0.5)
-        
-        # Progress update every 25 items
-        if (idx + 1) % 25 == 0:
-            print(f"\n=== Progress Update ===")
-            print(f"Processed: {idx + 1}/{len(products_with_images)}")
-            print(f"Downloaded: {downloaded_count}")
-            print(f"Failed: {failed_count}")
+        else:
+            downloaded_count += 1
+        metrics.progress('images', done, len(jobs))
+    
+    download_product_images(products_with_images, images_dir, max_workers, rate_limit, refresh, on_result=report)
     
     print(f"\n=== Final Download Summary ===")
     print(f"Total unique products: {len(df)}")
     print(f"Products with images: {len(products_with_images)}")
     print(f"Successfully downloaded: {downloaded_count}")
     print(f"Failed downloads: {failed_count}")
+    print(f"  (new: {metrics.value('images_total', status='downloaded')}, "
+          f"from image store: {metrics.value('images_total', status='linked')}, "
+          f"already present: {metrics.value('images_total', status='exists')}, "
+          f"{metrics.value('bytes_downloaded_total') / 1e6:.1f} MB)")
     print(f"Skipped (no image/barcode): {skipped_count}")
     print(f"Images saved to: {images_dir.absolute()}")
     
     # List first few downloaded files as verification
     if downloaded_count > 0:
         print(f"\nFirst few downloaded files:")
-        downloaded_files = list(images_dir.glob("*"))[:5]
+        downloaded_files = [f for f in images_dir.glob("*") if not f.name.startswith('.')][:5]
         for file in downloaded_files:
             print(f"  {file.name}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download product images for 265 test.xlsx")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent downloads")
+    parser.add_argument('--rate-limit', type=float, default=4.0, help="Max requests per second per host")
+    parser.add_argument('--refresh', action='store_true', help="Revalidate existing images against the CDN (ETag / Last-Modified)")
+    args = parser.parse_args()
+    main(max_workers=args.workers, rate_limit=args.rate_limit, refresh=args.refresh)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# Columns holding barcodes in any of our workbooks; always stored and read as text
+BARCODE_COLUMNS = ('Barcode', 'barcode', 'Variant Barcode', 'variant barcode')
+
+TEXT_FORMAT = '@'
+
+
+def _as_text(value):
+    """Barcode cell value as a string (None for empty cells)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Legacy files stored some barcodes as numbers
+        value = int(value)
+    return str(value)
+
+
+def _column_values(series, as_text):
+    """Plain Python values for one column, with NaN/NA turned into None"""
+    if as_text:
+        return [_as_text(value) for value in series.tolist()]
+    values = series.astype(object).where(series.notna(), None)
+    return values.tolist()
+
+
+def write_excel(df, path, sheet_name='Sheet1', text_columns=BARCODE_COLUMNS):
+    """Write `df` to an .xlsx file in a single streaming pass
+
+    Uses openpyxl's write-only workbook, so rows go straight to disk instead
+    of building a full in-memory object model. Columns named in
+    `text_columns` are written as text cells (format '@'), which keeps
+    barcode leading zeros without any CSV round trip. The file is written
+    to a temporary name and moved into place once complete.
+    """
+    # Imported here so scripts that only read catalogs do not pay for openpyxl
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    path = Path(path)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+
+    text_flags = [column in text_columns for column in df.columns]
+    sheet.append([str(column) for column in df.columns])
+
+    columns = [_column_values(df[column], as_text) for column, as_text in zip(df.columns, text_flags)]
+    text_positions = [i for i, as_text in enumerate(text_flags) if as_text]
+    for row in zip(*columns):
+        row = list(row)
+        for i in text_positions:
+            if row[i] is not None:
+                cell = WriteOnlyCell(sheet, value=row[i])
+                cell.number_format = TEXT_FORMAT
+                row[i] = cell
+        sheet.append(row)
+
+    temp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        workbook.save(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def read_excel(path, text_columns=BARCODE_COLUMNS, **kwargs):
+    """pd.read_excel with barcode columns read back as strings"""
+    return pd.read_excel(path, dtype={column: str for column in text_columns}, **kwargs)
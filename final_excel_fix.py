@@ -1,47 +1,40 @@
-import pandas as pd
-import csv
+from catalog_store import load_catalog, save_catalog
+from image_manifest import load_manifest
+
+def restore_leading_zeros(df):
+    """Restore the leading zero of 12-digit barcodes that were read as numbers
+
+    A barcode like 014402685064 comes back from Excel as the 11-digit
+    14402685064. Returns the list of (old, new) barcodes that were fixed.
+    """
+    barcodes = df['Barcode'].astype(str)
+    lost_zero = barcodes.str.fullmatch(r'\d{11}', na=False)
+    fixed = list(zip(barcodes[lost_zero], '0' + barcodes[lost_zero]))
+    df['Barcode'] = barcodes.where(~lost_zero, '0' + barcodes)
+    return fixed
 
 def main():
     print("Final Excel fix - preserving leading zeros...")
     
-    # Load the current Excel file
-    df = pd.read_excel('265 test.xlsx')
-    
-    # Convert barcodes to strings
-    df['Barcode'] = df['Barcode'].astype(str)
+    # Load the current Excel file (barcodes as text)
+    df = load_catalog('265 test.xlsx')
     
     # Fix the problematic barcodes by adding leading zeros
-    problematic_barcodes = ['14402685064', '10636953796', '12329850369', '14036802684', '18855675416', '13202150738']
-    
-    for barcode in problematic_barcodes:
-        mask = df['Barcode'] == barcode
-        if mask.any():
-            df.loc[mask, 'Barcode'] = f"0{barcode}"
-            print(f"Fixed: {barcode} → 0{barcode}")
+    for old_barcode, new_barcode in restore_leading_zeros(df):
+        print(f"Fixed: {old_barcode} → {new_barcode}")
     
-    # First save as CSV to preserve the string format
-    df.to_csv('265_test_temp.csv', index=False)
-    print("✅ Saved as CSV to preserve string format")
-    
-    # Read back from CSV and save as Excel
-    df_from_csv = pd.read_csv('265_test_temp.csv', dtype={'Barcode': str})
-    
-    # Save to Excel 
-    df_from_csv.to_excel('265 test.xlsx', index=False)
+    # Barcodes are written as text cells, so the zeros survive in one pass
+    save_catalog(df, '265 test.xlsx')
     
     print("✅ Saved as Excel with text formatting for barcodes")
     
-    # Clean up temporary file
-    import os
-    os.remove('265_test_temp.csv')
-    
     # Final verification
     print("\n=== FINAL VERIFICATION ===")
-    df_final = pd.read_excel('265 test.xlsx', dtype={'Barcode': str})
+    # What was written is exactly df, so verify it without re-reading the file
+    df_final = df
     
     # Get image files
-    import os
-    image_files = [f.split('.')[0] for f in os.listdir('downloaded_images')]
+    image_files = load_manifest('downloaded_images').barcodes()
     
     # Check matches
     excel_barcodes = df_final['Barcode'].tolist()
@@ -1,7 +1,9 @@
-import pandas as pd
 from pathlib import Path
 import re
 
+from catalog_store import load_catalog, save_catalog
+from image_manifest import load_manifest
+
 def fix_crayola_issues():
     """Fix barcode format and image matching issues in Crayola project"""
     crayola_dir = Path('crayola')
@@ -11,7 +13,7 @@ def fix_crayola_issues():
     print("🔧 Fixing Crayola project issues...")
     
     # Load data
-    df = pd.read_excel(excel_file)
+    df = load_catalog(excel_file)
     print(f"📊 Loaded {len(df)} products")
     
     # Fix barcode format - ensure all are 12 digits with leading zeros
@@ -35,14 +37,13 @@ def fix_crayola_issues():
     
     # Check image matching
     print("\n🖼️  Checking image matching...")
-    image_files = list(images_dir.glob('*.jpg')) + list(images_dir.glob('*.png'))
-    image_barcodes = set([f.stem for f in image_files])
+    image_barcodes = load_manifest(images_dir).barcodes(('.jpg', '.png'))
     
     barcodes_in_excel = set(df['barcode'].astype(str))
     missing_images = barcodes_in_excel - image_barcodes
     extra_images = image_barcodes - barcodes_in_excel
     
-    print(f"   - Images downloaded: {len(image_files)}")
+    print(f"   - Images downloaded: {len(image_barcodes)}")
     print(f"   - Products in Excel: {len(df)}")
     print(f"   - Missing images: {len(missing_images)}")
     print(f"   - Extra images: {len(extra_images)}")
@@ -55,7 +56,7 @@ def fix_crayola_issues():
                 print(f"   - {product.iloc[0]['english_name']} (Barcode: {barcode})")
     
     # Save fixed Excel file
-    df.to_excel(excel_file, index=False)
+    save_catalog(df, excel_file)
     print(f"\n✅ Saved fixed crayola_products.xlsx")
     
     # Final summary
@@ -1,17 +1,44 @@
-import pandas as pd
-import random
-import shutil
 from pathlib import Path
-import os
 
-def generate_barcode():
-    """Generate a 12-digit barcode starting with 01"""
-    remaining_digits = ''.join([str(random.randint(0, 9)) for _ in range(10)])
-    return f"01{remaining_digits}"
+from barcode_registry import BarcodeRegistry
+from catalog_store import load_catalog, save_catalog
+from image_manifest import load_manifest
+from image_store import ImageStore
+
+def reassign_duplicate_barcodes(df, reserved=(), project='265'):
+    """Give a new unique barcode to every product whose barcode repeats an
+    earlier row or is one of the `reserved` barcodes
+
+    Returns (fixed copy of df, list of changes).
+    """
+    df_fixed = df.copy()
+    barcodes = df_fixed['Barcode'].astype(str)
+    needs_new = barcodes.duplicated(keep='first') | barcodes.isin(set(reserved))
+    
+    # Record all existing barcodes in the shared registry so new ones never
+    # collide with them, then allocate every replacement in one call
+    with BarcodeRegistry() as registry:
+        registry.register(barcodes.tolist(), project=project)
+        new_barcodes = registry.allocate(int(needs_new.sum()), project=project)
+    
+    changes_made = []
+    for idx, new_barcode in zip(df_fixed.index[needs_new], new_barcodes):
+        old_barcode = df_fixed.at[idx, 'Barcode']
+        df_fixed.at[idx, 'Barcode'] = new_barcode
+        
+        english_title = df_fixed.at[idx, 'English Title']
+        title = english_title[:40] if isinstance(english_title, str) and english_title else "No Title"
+        changes_made.append({
+            'title': title,
+            'old_barcode': str(old_barcode),
+            'new_barcode': new_barcode,
+            'row_index': idx
+        })
+    return df_fixed, changes_made
 
 def main():
     print("Loading Excel file...")
-    df = pd.read_excel('265 test.xlsx')
+    df = load_catalog('265 test.xlsx')
     
     print(f"Total products: {len(df)}")
     
@@ -29,51 +56,23 @@ def main():
             title = row['English Title'][:50] if row['English Title'] else "No Title"
             print(f"    - {title}...")
     
-    # Create a copy of the dataframe to modify
-    df_fixed = df.copy()
-    
-    # Track all existing barcodes to avoid generating duplicates
-    all_barcodes = set(df['Barcode'].astype(str).tolist())
-    
     # Fix duplicates by assigning new barcodes (except keep original for first occurrence)
-    changes_made = []
+    df_fixed, changes_made = reassign_duplicate_barcodes(df)
     
-    for duplicate_barcode in duplicate_barcodes.index:
-        duplicate_rows = df_fixed[df_fixed['Barcode'] == duplicate_barcode]
-        
-        # Skip the first occurrence (keep original), change the rest
-        for i, (idx, row) in enumerate(duplicate_rows.iterrows()):
-            if i == 0:  # Keep first occurrence unchanged
-                continue
-                
-            # Generate new unique barcode
-            new_barcode = generate_barcode()
-            while new_barcode in all_barcodes:
-                new_barcode = generate_barcode()
-            
-            # Update the dataframe
-            old_barcode = row['Barcode']
-            df_fixed.at[idx, 'Barcode'] = new_barcode
-            all_barcodes.add(new_barcode)
-            
-            title = row['English Title'][:40] if row['English Title'] else "No Title"
-            changes_made.append({
-                'title': title,
-                'old_barcode': str(old_barcode),
-                'new_barcode': new_barcode,
-                'row_index': idx
-            })
-            
-            print(f"\nChanged: {title}...")
-            print(f"  Old barcode: {old_barcode}")
-            print(f"  New barcode: {new_barcode}")
+    for change in changes_made:
+        print(f"\nChanged: {change['title']}...")
+        print(f"  Old barcode: {change['old_barcode']}")
+        print(f"  New barcode: {change['new_barcode']}")
     
     # Save updated Excel file
-    df_fixed.to_excel('265 test.xlsx', index=False)
+    save_catalog(df_fixed, '265 test.xlsx')
     print(f"\n✅ Updated Excel file with {len(changes_made)} barcode changes")
     
     # Now handle the image files
     images_dir = Path('downloaded_images')
+    store = ImageStore()
+    manifest = load_manifest(images_dir)
+    images_by_barcode = manifest.by_barcode()
     
     for change in changes_made:
         old_barcode = change['old_barcode']
@@ -81,22 +80,25 @@ def main():
         title = change['title']
         
         # Find the image file with the old barcode
-        old_image_files = list(images_dir.glob(f"{old_barcode}.*"))
+        old_image_name = images_by_barcode.get(old_barcode)
         
-        if old_image_files:
-            old_image_file = old_image_files[0]  # Take the first match
+        if old_image_name:
+            old_image_file = images_dir / old_image_name
             extension = old_image_file.suffix
             new_image_file = images_dir / f"{new_barcode}{extension}"
             
-            # Copy the image file with new name
-            shutil.copy2(old_image_file, new_image_file)
-            print(f"📸 Copied image: {old_image_file.name} → {new_image_file.name}")
+            # Link the image under its new name (no byte copy)
+            store.link_existing(old_image_file, new_image_file)
+            manifest.record(new_image_file, url=manifest.entries[old_image_name]['url'])
+            print(f"📸 Linked image: {old_image_file.name} → {new_image_file.name}")
         else:
             print(f"⚠️  No image found for old barcode: {old_barcode}")
     
+    manifest.save()
+    
     # Verify final results
     print(f"\n=== VERIFICATION ===")
-    df_final = pd.read_excel('265 test.xlsx')
+    df_final = load_catalog('265 test.xlsx')
     final_barcode_counts = df_final['Barcode'].value_counts()
     remaining_duplicates = final_barcode_counts[final_barcode_counts > 1]
     
@@ -108,8 +110,7 @@ def main():
             print(f"  - {barcode}: {count} times")
     
     # Count image files
-    image_files = list(images_dir.glob("*"))
-    print(f"📸 Total image files: {len(image_files)}")
+    print(f"📸 Total image files: {len(manifest)}")
     print(f"📋 Total products: {len(df_final)}")
     
     print(f"\nSummary of changes:")
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from metrics import metrics
+
+# Worth retrying: timeouts, throttling and server-side errors. Everything
+# else (404, 403, 410, ...) is permanent and fails on the first attempt.
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Consecutive failures (after which a host is skipped) and how long it is
+# skipped before one probe request is let through
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60.0
+
+# Longest Retry-After (seconds) a request waits for; a longer one fails it
+MAX_RETRY_AFTER = 300.0
+
+
+class HostUnavailable(Exception):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+def status_of(error):
+    response = getattr(error, 'response', None)
+    return response.status_code if response is not None else None
+
+
+def is_retryable(error):
+    if isinstance(error, requests.HTTPError):
+        return status_of(error) in RETRYABLE_STATUS
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def retry_after(error):
+    """Seconds asked for by a Retry-After header (429/503), or None"""
+    response = getattr(error, 'response', None)
+    if response is None or response.status_code not in (429, 503):
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Stops requests to one host after FAILURE_THRESHOLD consecutive failures
+
+    While open, requests fail immediately with HostUnavailable. After
+    `reset_timeout` seconds a single probe is let through: success closes
+    the circuit, failure keeps it open for another period. Throttling (429)
+    does not count as a failure, since the host is up.
+    """
+
+    def __init__(self, host, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                raise HostUnavailable(f"{self.host} is unavailable ({self.failures} consecutive failures)")
+            self.probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    print(f"🔌 {self.host}: {self.failures} failures in a row, pausing requests "
+                          f"for {self.reset_timeout:.0f}s")
+                    metrics.inc('circuit_open_total', host=self.host)
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+# One breaker per host, shared by every policy in the process
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host):
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+class RetryPolicy:
+    """Retries retryable HTTP failures with exponential backoff and jitter
+
+    Attempt n waits a random time between 0 and base_delay * 2**(n-1)
+    (capped at max_delay), or what the server asked for in Retry-After if
+    that is longer. A Retry-After is always honoured in full; if it is over
+    max_retry_after the request is given up instead of retried early.
+    Requests go through the host's circuit breaker.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=30.0, max_retry_after=MAX_RETRY_AFTER):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt, error=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        requested = retry_after(error)
+        if requested is not None:
+            delay = max(delay, requested)
+        return delay
+
+    def call(self, url, func, *args, kind='http', **kwargs):
+        """Return func(*args, **kwargs), retrying it while it fails retryably
+
+        `func` makes one request to `url` and raises on failure (for HTTP
+        errors, via response.raise_for_status()). The last error is re-raised
+        once attempts run out; permanent errors, and throttling that asks for
+        more than max_retry_after, are raised straight away.
+        """
+        breaker = breaker_for(urlparse(url).netloc)
+        for attempt in range(1, self.max_attempts + 1):
+            breaker.before_request()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Permanent errors (404, bad payload, ...) mean the host answered
+                    breaker.record_success()
+                    raise
+                if status_of(e) == 429:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                if attempt == self.max_attempts:
+                    raise
+                requested = retry_after(e)
+                if requested is not None and requested > self.max_retry_after:
+                    # Retrying sooner than the server asked would only be throttled again
+                    raise
+                metrics.inc('http_retries_total', kind=kind)
+                time.sleep(self.backoff(attempt, e))
+            else:
+                breaker.record_success()
+                return result
+
+
+DEFAULT_POLICY = RetryPolicy()
@@ -0,0 +1,297 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_retry import HostUnavailable, RetryPolicy
+from image_manifest import ImageManifest
+from image_store import ImageStore
+from metrics import metrics
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DOWNLOADED = 'downloaded'
+EXISTS = 'exists'
+LINKED = 'linked'
+NOT_MODIFIED = 'not_modified'
+FAILED = 'failed'
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_file_extension(url):
+    """Get file extension from URL"""
+    parsed = urlparse(url)
+    path = parsed.path
+    if '.' in path:
+        return path.split('.')[-1].lower()
+    return 'jpg'  # Default extension
+
+
+class HostRateLimiter:
+    """Spaces out requests so each host sees at most `rate` requests per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ImageDownloader:
+    """Concurrent image downloader with one pooled session per host
+
+    `max_workers` threads share the sessions; `rate_limit` is the number of
+    requests per second allowed against any single host (0 disables it).
+    With an ImageStore, URLs already in the store are linked into place
+    without touching the network and new downloads are added to it. With
+    `revalidate=True` stored URLs and existing files are checked against the
+    CDN with their saved ETag / Last-Modified, so a catalog refresh only
+    transfers images that changed. Every image written is recorded in the
+    .manifest.json of its folder (see image_manifest.py). Failed requests
+    are retried according to http_retry.RetryPolicy.
+
+    Jobs for the same URL (products sharing a photo) are fetched one at a
+    time: the first downloads it into the store, the others then link it.
+    """
+
+    def __init__(self, max_workers=8, rate_limit=4.0, timeout=30, max_retries=4, store=None,
+                 revalidate=False):
+        self.max_workers = max_workers
+        self.store = store
+        self.revalidate = revalidate
+        self.timeout = timeout
+        self.retry_policy = RetryPolicy(max_attempts=max_retries)
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self._sessions = {}
+        self._manifests = {}
+        self._url_locks = {}
+        # URLs downloaded or revalidated by this downloader
+        self._fetched = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        for manifest in self._manifests.values():
+            manifest.save()
+        if self.store is not None:
+            self.store.save()
+
+    def session_for(self, url):
+        """Return the shared session for the URL's host, creating it on first use"""
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers['User-Agent'] = USER_AGENT
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+        return session
+
+    def url_lock(self, url):
+        """Lock held while a URL is fetched into the store; its staging file is shared"""
+        with self._lock:
+            lock = self._url_locks.get(url)
+            if lock is None:
+                lock = self._url_locks[url] = threading.Lock()
+        return lock
+
+    def manifest_for(self, filename):
+        """Manifest of the folder `filename` lives in (only used from the main thread)"""
+        directory = Path(filename).parent
+        manifest = self._manifests.get(directory)
+        if manifest is None:
+            manifest = self._manifests[directory] = ImageManifest(directory)
+        return manifest
+
+    def download_image(self, url, filename, validators=None):
+        """Stream an image to `filename` with retry, resume and revalidation
+
+        Bytes are written in chunks to `<filename>.part` and renamed into
+        place once complete. A .part left by an interrupted attempt (or run)
+        is resumed with an HTTP Range request. `validators` from a previous
+        download make the request conditional. Returns (status, validators)
+        where status is DOWNLOADED, NOT_MODIFIED or FAILED.
+        """
+        try:
+            return self.retry_policy.call(url, self._request_image, url, filename, validators, kind='image')
+        except HostUnavailable:
+            pass  # reported once when the circuit opened
+        except Exception as e:
+            print(f"    Failed {url}: {e}")
+        metrics.inc('failures_total', kind='image')
+        return FAILED, None
+
+    def _request_image(self, url, filename, validators):
+        """One download attempt; raises on failure"""
+        part_path = Path(f"{filename}.part")
+        meta_path = Path(f"{filename}.part.json")
+        headers = {}
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        part_validators = {}
+        if offset and meta_path.exists():
+            with open(meta_path, encoding='utf-8') as f:
+                part_validators = json.load(f)
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+            if_range = part_validators.get('etag') or part_validators.get('last_modified')
+            if if_range:
+                headers['If-Range'] = if_range
+        elif validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        self.rate_limiter.wait(urlparse(url).netloc)
+        request_start = time.perf_counter()
+        with self.session_for(url).get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            metrics.observe('http_request_seconds', time.perf_counter() - request_start, kind='image')
+            if response.status_code == 304:
+                return NOT_MODIFIED, validators
+            if response.status_code == 416:
+                # Stale partial file; start over without a Range header
+                part_path.unlink()
+                return self._request_image(url, filename, validators)
+            response.raise_for_status()
+
+            new_validators = {}
+            if response.headers.get('ETag'):
+                new_validators['etag'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                new_validators['last_modified'] = response.headers['Last-Modified']
+
+            resuming = response.status_code == 206
+            if resuming:
+                new_validators = part_validators or new_validators
+            else:
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(new_validators, f)
+
+            with open(part_path, 'ab' if resuming else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    metrics.inc('bytes_downloaded_total', len(chunk))
+
+        os.replace(part_path, filename)
+        if meta_path.exists():
+            meta_path.unlink()
+        return DOWNLOADED, new_validators
+
+    def _fetch(self, url, filename):
+        exists = Path(filename).exists()
+        if exists and not self.revalidate:
+            return EXISTS
+        if self.store is None:
+            if exists:
+                return EXISTS
+            status, _ = self.download_image(url, filename)
+            return status
+
+        with self.url_lock(url):
+            sha = self.store.lookup(url)
+            if sha and (not self.revalidate or url in self._fetched):
+                self.store.link(sha, filename)
+                return EXISTS if exists else LINKED
+
+            staging_path = self.store.staging_path(url)
+            status, validators = self.download_image(url, staging_path, self.store.validators(url) if sha else None)
+            if status == FAILED:
+                return FAILED
+            self._fetched.add(url)
+            if status == NOT_MODIFIED:
+                self.store.link(sha, filename)
+                return EXISTS if exists else LINKED
+            self.store.link(self.store.ingest(staging_path, url, **validators), filename)
+            return DOWNLOADED
+
+    def download_all(self, jobs, on_result=None, max_pending=None):
+        """Download (url, filename) jobs concurrently
+
+        Files that already exist are skipped unless revalidating. Returns a dict mapping each
+        filename to DOWNLOADED, EXISTS, LINKED or FAILED; `on_result(url, filename,
+        status)` is called from the main thread as each job finishes. A job that
+        raises (e.g. an OSError linking from the store) is reported as FAILED.
+
+        `jobs` may be a lazy iterator. With `max_pending`, it is only advanced
+        while fewer than that many downloads are in flight, so the code
+        producing the jobs runs alongside the downloads without queueing
+        more than `max_pending` of them.
+        """
+        results = {}
+        pending = {}
+        completed = queue.Queue()
+
+        def finish(future):
+            url, filename = pending.pop(future)
+            try:
+                status = future.result()
+            except Exception as e:
+                # Store / filesystem errors outside download_image: fail this
+                # job only, so callers still get a result (and a placeholder)
+                print(f"    Failed {url}: {e}")
+                metrics.inc('failures_total', kind='image')
+                status = FAILED
+            results[filename] = status
+            metrics.inc('images_total', status=status)
+            if status in (EXISTS, LINKED):
+                metrics.inc('cache_hits_total', cache='image')
+            if status != FAILED:
+                sha = self.store.lookup(url) if self.store is not None else None
+                self.manifest_for(filename).record(filename, url=url, sha256=sha)
+            if on_result:
+                on_result(url, filename, status)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for url, filename in jobs:
+                future = pool.submit(self._fetch, url, filename)
+                pending[future] = (url, filename)
+                future.add_done_callback(completed.put)
+                while max_pending and len(pending) >= max_pending:
+                    finish(completed.get())
+                while not completed.empty():
+                    finish(completed.get())
+            while pending:
+                finish(completed.get())
+        return results
+
+
+def download_images(jobs, max_workers=8, rate_limit=4.0, on_result=None, store=None, revalidate=False,
+                    max_pending=None):
+    """Download (url, filename) jobs with a short-lived ImageDownloader
+
+    Uses the shared ImageStore unless another store is passed in.
+    """
+    store = store if store is not None else ImageStore()
+    with ImageDownloader(max_workers=max_workers, rate_limit=rate_limit, store=store,
+                         revalidate=revalidate) as downloader:
+        return downloader.download_all(jobs, on_result=on_result, max_pending=max_pending)
@@ -0,0 +1,117 @@
+import json
+import os
+from pathlib import Path
+
+from image_store import file_sha256
+
+MANIFEST_NAME = '.manifest.json'
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+class ImageManifest:
+    """Index of the images in one folder, stored in the folder as .manifest.json
+
+    Maps each file name to its barcode (the file stem), extension, size,
+    mtime, SHA-256 and source URL. refresh() brings it up to date with one
+    os.scandir pass, hashing only files whose size or mtime changed, so
+    coverage checks become set operations instead of repeated globbing.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / MANIFEST_NAME
+        self._dirty = False
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _entry(self, name, stat, sha256=None, url=None):
+        previous = self.entries.get(name, {})
+        unchanged = previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns
+        if sha256 is None:
+            sha256 = previous.get('sha256') if unchanged else None
+            if sha256 is None:
+                sha256 = file_sha256(self.directory / name)
+        stem, extension = os.path.splitext(name)
+        return {
+            'barcode': stem,
+            'extension': extension.lower(),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'url': url if url is not None else previous.get('url'),
+        }
+
+    def refresh(self):
+        """Re-sync with the folder; returns (added, changed, removed) counts"""
+        added = changed = 0
+        seen = set()
+        if self.directory.is_dir():
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if not entry.is_file() or not name.lower().endswith(IMAGE_EXTENSIONS) or name.startswith('.'):
+                        continue
+                    seen.add(name)
+                    stat = entry.stat()
+                    previous = self.entries.get(name)
+                    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                        continue
+                    self.entries[name] = self._entry(name, stat)
+                    if previous:
+                        changed += 1
+                    else:
+                        added += 1
+        removed = [name for name in self.entries if name not in seen]
+        for name in removed:
+            del self.entries[name]
+        if added or changed or removed:
+            self._dirty = True
+        return added, changed, len(removed)
+
+    def record(self, path, url=None, sha256=None):
+        """Add or update the entry for an image just written to this folder"""
+        name = Path(path).name
+        self.entries[name] = self._entry(name, os.stat(self.directory / name), sha256, url)
+        self._dirty = True
+
+    def discard(self, path):
+        if self.entries.pop(Path(path).name, None) is not None:
+            self._dirty = True
+
+    def barcodes(self, extensions=None):
+        """Set of barcodes with an image (optionally only these extensions)"""
+        return {entry['barcode'] for entry in self.entries.values()
+                if extensions is None or entry['extension'] in extensions}
+
+    def by_barcode(self):
+        """{barcode: file name} (first name in sorted order if there are several)"""
+        files = {}
+        for name in sorted(self.entries):
+            files.setdefault(self.entries[name]['barcode'], name)
+        return files
+
+    def save(self):
+        """Write the manifest atomically if it changed"""
+        if not self._dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(MANIFEST_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def load_manifest(directory):
+    """Manifest for `directory`, validated against the folder and saved"""
+    manifest = ImageManifest(directory)
+    manifest.refresh()
+    manifest.save()
+    return manifest
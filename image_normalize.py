@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # only needed when normalizing
+    Image = None
+
+from image_manifest import load_manifest
+
+# Talabat image spec defaults; all three can be changed on the command line
+MAX_SIZE = 1000
+TARGET_FORMAT = 'jpeg'
+QUALITY = 85
+
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp', 'gif': '.gif'}
+
+STATE_NAME = '.normalized.json'
+
+
+def sniff_format(head):
+    """Real image format from the first bytes of a file (None if not an image)"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    return None
+
+
+def file_format(path):
+    with open(path, 'rb') as f:
+        return sniff_format(f.read(16))
+
+
+def _flatten(image):
+    """RGB copy of `image`, with any transparency composited onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(task):
+    """Decode, resize and re-encode one image (runs in a worker process)
+
+    Returns (source name, detected format, error or None).
+    """
+    source, dest, max_size, fmt, quality = task
+    detected = file_format(source)
+    if detected is None:
+        return source.name, None, 'not an image'
+    temp_path = dest.with_name(f".{dest.name}.tmp")
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_size, max_size), Image.LANCZOS)
+            if fmt == 'jpeg':
+                image = _flatten(image)
+            image.save(temp_path, format=fmt.upper(), quality=quality, optimize=True)
+        os.replace(temp_path, dest)
+    except Exception as e:
+        if temp_path.exists():
+            temp_path.unlink()
+        return source.name, detected, str(e)
+    return source.name, detected, None
+
+
+def load_state(output_dir):
+    state_path = output_dir / STATE_NAME
+    if state_path.exists():
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(output_dir, state):
+    tmp_path = output_dir / (STATE_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, output_dir / STATE_NAME)
+
+
+def normalize_directory(source_dir, output_dir=None, max_size=MAX_SIZE, fmt=TARGET_FORMAT,
+                        quality=QUALITY, max_workers=None, force=False):
+    """Normalize every image in `source_dir` into `output_dir`
+
+    Each image's real format is sniffed from its magic bytes, then it is
+    resized to fit `max_size` and re-encoded as `fmt`. The output is named
+    <barcode><extension of fmt>, whatever the source was called. Images
+    whose source hash (from the folder manifest) and settings match the last
+    run are skipped. Returns {'normalized', 'skipped', 'removed', 'failed'};
+    'failed' is a list of (file name, reason).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required for image normalization (pip install Pillow)")
+    source_dir = Path(source_dir)
+    output_dir = Path(output_dir) if output_dir else source_dir.with_name(f"{source_dir.name}_normalized")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(source_dir)
+    state = load_state(output_dir)
+    settings = [max_size, fmt, quality]
+    extension = FORMAT_EXTENSIONS[fmt]
+
+    # One source per barcode; an image saved under two extensions is normalized once
+    sources = {name: manifest.entries[name] for name in manifest.by_barcode().values()}
+
+    tasks = []
+    skipped = 0
+    for name, entry in sources.items():
+        dest = output_dir / (entry['barcode'] + extension)
+        previous = state.get(name)
+        if (not force and previous and previous['sha256'] == entry['sha256']
+                and previous['settings'] == settings
+                and (previous['output'] is None or dest.exists())):
+            skipped += 1
+            continue
+        tasks.append((source_dir / name, dest, max_size, fmt, quality))
+
+    # Drop outputs whose source image is gone
+    removed = [name for name in state if name not in sources]
+    for name in removed:
+        output = state.pop(name)['output']
+        if output and (output_dir / output).exists():
+            (output_dir / output).unlink()
+
+    if len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(normalize_image, tasks, chunksize=16))
+    else:
+        results = [normalize_image(task) for task in tasks]
+
+    failed = []
+    for (source, dest, *_), (name, detected, error) in zip(tasks, results):
+        if error:
+            failed.append((name, error))
+        state[name] = {
+            'sha256': sources[name]['sha256'],
+            'settings': settings,
+            'format': detected,
+            'output': None if error else dest.name,
+        }
+        expected = ('.jpg', '.jpeg') if detected == 'jpeg' else (FORMAT_EXTENSIONS.get(detected),)
+        if detected and Path(name).suffix.lower() not in expected:
+            print(f"ℹ️  {name} is really {detected.upper()}")
+
+    save_state(output_dir, state)
+    return {'normalized': len(tasks) - len(failed), 'skipped': skipped, 'removed': len(removed),
+            'failed': failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resize and re-encode product images to the Talabat spec")
+    parser.add_argument('images_dir', help="Folder of downloaded images (named by barcode)")
+    parser.add_argument('--output', help="Output folder (default: <images_dir>_normalized)")
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE, help="Longest side in pixels")
+    parser.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS), default=TARGET_FORMAT)
+    parser.add_argument('--quality', type=int, default=QUALITY, help="JPEG/WebP quality")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Re-normalize images that did not change")
+    args = parser.parse_args()
+
+    print(f"🖼️  Normalizing images in {args.images_dir}...")
+    result = normalize_directory(args.images_dir, args.output, args.max_size, args.format,
+                                 args.quality, args.workers, args.force)
+    for name, reason in result['failed']:
+        print(f"❌ {name}: {reason}")
+    print(f"✅ Normalized {result['normalized']}, skipped {result['skipped']} unchanged, "
+          f"removed {result['removed']} stale, {len(result['failed'])} failed")
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+DEFAULT_STORE_DIR = 'image_store'
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageStore:
+    """Content-addressed image store shared by every brand project
+
+    Image bytes live once under objects/<sha[:2]>/<sha256>; `urls.json` maps
+    each source URL to the hash of the bytes it served. Project folders only
+    hold hardlinks (or symlinks where hardlinks are not possible) named after
+    barcodes, so re-running a project or renaming a barcode never copies bytes.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.tmp_dir = self.root / 'tmp'
+        self.index_path = self.root / 'urls.json'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dirty = False
+        if self.index_path.exists():
+            with open(self.index_path, encoding='utf-8') as f:
+                self.urls = json.load(f)
+        else:
+            self.urls = {}
+
+    def object_path(self, sha):
+        return self.objects_dir / sha[:2] / sha
+
+    def lookup(self, url):
+        """Return the stored SHA-256 for a URL, or None if not stored yet"""
+        entry = self.urls.get(url)
+        if entry and self.object_path(entry['sha256']).exists():
+            return entry['sha256']
+        return None
+
+    def validators(self, url):
+        """Return the ETag / Last-Modified saved for a URL"""
+        entry = self.urls.get(url) or {}
+        return {key: entry[key] for key in ('etag', 'last_modified') if entry.get(key)}
+
+    def staging_path(self, url):
+        """Stable download path inside the store, so partial downloads can resume
+        and ingesting the finished file is a rename
+
+        The path is the same for every download of a URL; concurrent fetches
+        of one URL must take turns (see ImageDownloader.url_lock).
+        """
+        return self.tmp_dir / hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def ingest(self, path, url=None, **meta):
+        """Move a file into the store and return its SHA-256
+
+        If identical bytes are already stored the file is simply removed.
+        `meta` (e.g. etag, last_modified) is saved with the URL entry.
+        """
+        sha = file_sha256(path)
+        target = self.object_path(sha)
+        target.parent.mkdir(exist_ok=True)
+        if target.exists():
+            os.remove(path)
+        else:
+            os.replace(path, target)
+        if url:
+            self.record(url, sha, **meta)
+        return sha
+
+    def adopt(self, path, url=None, sha=None):
+        """Add an existing project file to the store without moving it
+
+        The file is hardlinked into objects/ when possible, so it costs no
+        extra disk; otherwise its bytes are copied in once. Pass `sha` when
+        the file's hash is already known (e.g. from its folder manifest).
+        """
+        sha = sha or file_sha256(path)
+        target = self.object_path(sha)
+        target.parent.mkdir(exist_ok=True)
+        if not target.exists():
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy2(path, target)
+        if url:
+            self.record(url, sha)
+        return sha
+
+    def record(self, url, sha, **meta):
+        with self._lock:
+            self.urls[url] = dict(meta, sha256=sha)
+            self._dirty = True
+
+    def link(self, sha, dest):
+        """Expose a stored object at `dest` (hardlink, else symlink, else copy)"""
+        source = self.object_path(sha)
+        dest = Path(dest)
+        if dest.exists() or dest.is_symlink():
+            if dest.exists() and os.path.samefile(source, dest):
+                return dest
+            dest.unlink()
+        try:
+            os.link(source, dest)
+        except OSError:
+            try:
+                os.symlink(source.resolve(), dest)
+            except OSError:
+                shutil.copy2(source, dest)
+        return dest
+
+    def link_existing(self, src, dest, sha=None):
+        """Give an existing image a second name without copying its bytes"""
+        return self.link(self.adopt(src, sha=sha), dest)
+
+    def save(self):
+        """Write the URL index atomically if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.index_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.urls, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # only needed when validating
+    Image = None
+
+from brands import BRANDS
+from image_manifest import load_manifest
+from image_normalize import file_format
+
+OK = 'ok'
+PLACEHOLDER = 'placeholder'
+NOT_IMAGE = 'not_image'
+CORRUPT = 'corrupt'
+EMPTY = 'empty'
+
+# Images whose perceptual hashes differ in at most this many of 64 bits are
+# treated as the same photo
+MAX_DISTANCE = 3
+
+STATE_NAME = '.validation.json'
+
+
+def dhash(image):
+    """64-bit difference hash: survives resizing, re-encoding and small edits"""
+    small = image.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return f'{value:016x}'
+
+
+def check_image(path):
+    """Validate one image file (runs in a worker process)
+
+    Returns (status, detected format, perceptual hash or None, detail).
+    """
+    path = Path(path)
+    if path.stat().st_size == 0:
+        return EMPTY, None, None, 'empty file'
+    with open(path, 'rb') as f:
+        head = f.read(32)
+    if '_placeholder' in path.stem or head.startswith(b'Placeholder for'):
+        return PLACEHOLDER, None, None, 'placeholder written for a missing image'
+    detected = file_format(path)
+    if detected is None:
+        return NOT_IMAGE, None, None, f'unrecognised content {head[:12]!r}'
+    try:
+        with Image.open(path) as image:
+            # Decode at reduced scale where the codec allows it; a truncated
+            # or corrupt file still fails here
+            image.draft('L', (64, 64))
+            image.load()
+            return OK, detected, dhash(image), ''
+    except Exception as e:
+        return CORRUPT, detected, None, str(e)
+
+
+def load_state(directory):
+    state_path = Path(directory) / STATE_NAME
+    if state_path.exists():
+        with open(state_path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(directory, state):
+    tmp_path = Path(directory) / (STATE_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, Path(directory) / STATE_NAME)
+
+
+def validate_directories(directories, max_workers=None):
+    """Check every image in `directories`; returns {path: result dict}
+
+    Results are cached per folder in .validation.json by file hash, so only
+    new or changed images are decoded again.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required for image validation (pip install Pillow)")
+    results = {}
+    pending = []
+    states = {}
+    for directory in directories:
+        directory = Path(directory)
+        manifest = load_manifest(directory)
+        state = load_state(directory)
+        state = {name: result for name, result in state.items() if name in manifest.entries}
+        states[directory] = state
+        for name, entry in manifest.entries.items():
+            cached = state.get(name)
+            if cached and cached['sha256'] == entry['sha256']:
+                results[directory / name] = cached
+            else:
+                pending.append((directory, name, entry['sha256']))
+
+    paths = [directory / name for directory, name, _ in pending]
+    if len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            checked = list(pool.map(check_image, paths, chunksize=32))
+    else:
+        checked = [check_image(path) for path in paths]
+
+    for (directory, name, sha), (status, detected, phash, detail) in zip(pending, checked):
+        result = {'sha256': sha, 'status': status, 'format': detected, 'phash': phash, 'detail': detail}
+        states[directory][name] = result
+        results[directory / name] = result
+
+    for directory, state in states.items():
+        save_state(directory, state)
+    return results
+
+
+def duplicate_groups(phashes, max_distance=MAX_DISTANCE):
+    """Group paths whose perceptual hashes are within `max_distance` bits
+
+    Avoids comparing every pair: the 64 bits are split into
+    max_distance + 1 bands, and two hashes that close must agree exactly on
+    at least one band, so only paths sharing a band value are compared.
+    Returns a list of groups (sorted lists of paths), largest first.
+    """
+    bands = max_distance + 1
+    band_bits = 64 // bands
+    mask = (1 << band_bits) - 1
+
+    # Identical hashes are grouped directly; only distinct values are compared
+    paths_by_value = defaultdict(list)
+    for path, phash in phashes.items():
+        paths_by_value[int(phash, 16)].append(path)
+    values = list(paths_by_value)
+
+    parent = list(range(len(values)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, value in enumerate(values):
+            buckets[(value >> (band * band_bits)) & mask].append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if find(i) != find(j) and bin(values[i] ^ values[j]).count('1') <= max_distance:
+                        parent[find(i)] = find(j)
+
+    groups = defaultdict(list)
+    for i, value in enumerate(values):
+        groups[find(i)].extend(paths_by_value[value])
+    return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=len, reverse=True)
+
+
+def default_directories():
+    candidates = [Path(config['output_dir']) / 'images' for config in BRANDS.values()]
+    candidates += [Path('downloaded_images'), Path('new_items') / 'images']
+    return [directory for directory in candidates if directory.is_dir()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate product images and find near-duplicate photos")
+    parser.add_argument('directories', nargs='*', help="Image folders (default: every brand, downloaded_images, new_items/images)")
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE, help="Perceptual hash bits that may differ")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    directories = [Path(d) for d in args.directories] or default_directories()
+    print(f"🔍 Validating images in {', '.join(d.as_posix() for d in directories)}...")
+    results = validate_directories(directories, args.workers)
+
+    problems = {path: result for path, result in results.items() if result['status'] != OK}
+    for path, result in sorted(problems.items()):
+        print(f"❌ {path.as_posix()}: {result['status']} ({result['detail']})")
+
+    phashes = {path.as_posix(): result['phash'] for path, result in results.items() if result['phash']}
+    groups = duplicate_groups(phashes, args.max_distance)
+    for group in groups:
+        print(f"🔁 Same photo under {len(group)} files: {', '.join(group)}")
+
+    print(f"\n✅ {len(results) - len(problems)} valid images, {len(problems)} problems, "
+          f"{len(groups)} duplicate groups ({sum(len(g) for g in groups)} files)")
+
+    if args.json:
+        report = {
+            'problems': {path.as_posix(): result for path, result in sorted(problems.items())},
+            'duplicate_groups': groups,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Wrote {args.json}")
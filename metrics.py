@@ -0,0 +1,178 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Set to a folder to get metrics.jsonl and metrics.prom written there
+METRICS_DIR_ENV = 'PIPELINE_METRICS_DIR'
+
+PREFIX = 'talabat_'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Seconds between console progress lines for the same label
+CONSOLE_INTERVAL = 2.0
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Metrics:
+    """Counters and latency histograms shared by every pipeline stage
+
+    Stages call inc() / observe() / timer() / stage() instead of printing
+    per row. With a metrics directory, stage timings are appended to
+    metrics.jsonl as they finish, and write() (also run at exit) adds a
+    snapshot line and rewrites metrics.prom in the Prometheus textfile
+    format. Console output is limited to progress() lines, at most one per
+    label every CONSOLE_INTERVAL seconds.
+    """
+
+    def __init__(self, directory=None, console_interval=CONSOLE_INTERVAL):
+        self.directory = Path(directory) if directory else None
+        self.console_interval = console_interval
+        self.counters = {}
+        self.histograms = {}
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def value(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Record the duration of the block in histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time a pipeline stage (wall time histogram plus a JSON line event)
+
+        A stage that raises is timed too and counted in stage_failures_total;
+        its rows are not counted as processed.
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe('stage_seconds', seconds, stage=name)
+            if failed:
+                self.inc('stage_failures_total', stage=name)
+            elif rows is not None:
+                self.inc('rows_processed_total', rows, stage=name)
+            self.event('stage', stage=name, seconds=round(seconds, 4), rows=rows, failed=failed)
+            status = ' (failed)' if failed else ''
+            print(f"  ⏱️  {name}: {'' if rows is None else f'{rows} rows in '}{seconds:.2f}s{status}")
+
+    def event(self, kind, **fields):
+        """Append one JSON line to metrics.jsonl (if a directory is set)"""
+        if self.directory is None:
+            return
+        record = {'ts': round(time.time(), 3), 'event': kind, **fields}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.directory / 'metrics.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def progress(self, label, done, total=None, force=False):
+        """Print a progress line for `label`, at most once per console interval"""
+        now = time.monotonic()
+        with self._lock:
+            started, last = self._progress.get(label, (now, None))
+            finished = total is not None and done >= total
+            if not (force or finished or last is None or now - last >= self.console_interval):
+                return
+            self._progress[label] = (started, now)
+        elapsed = now - started
+        rate = f", {done / elapsed:.1f}/s" if elapsed > 0 else ''
+        of_total = f"/{total} ({done / total * 100:.0f}%)" if total else ''
+        print(f"📊 {label}: {done}{of_total}{rate}")
+
+    def prometheus_text(self):
+        # Samples are sorted by name, so each metric's TYPE line goes before its first sample
+        lines = []
+        typed = None
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name != typed:
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                    typed = name
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name != typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed = name
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': h.count,
+                                'sum': round(h.sum, 6), 'buckets': dict(zip(map(str, LATENCY_BUCKETS), h.buckets))}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+    def write(self):
+        """Write metrics.prom and a snapshot line to metrics.jsonl"""
+        if self.directory is None:
+            return
+        self.event('snapshot', **self.snapshot())
+        tmp_path = self.directory / 'metrics.prom.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, self.directory / 'metrics.prom')
+
+
+# Shared by every script in the process
+metrics = Metrics(os.environ.get(METRICS_DIR_ENV))
+atexit.register(metrics.write)
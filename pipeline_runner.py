@@ -0,0 +1,170 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from catalog_store import save_catalog
+from download_final_images import download_product_images
+from final_excel_fix import restore_leading_zeros
+from fix_duplicate_barcodes import reassign_duplicate_barcodes
+from metrics import metrics
+from process_unique_products import SOURCE_COLUMNS, build_products, load_unique_products
+from shopify_export import DEFAULT_CHUNKSIZE
+from translate_to_arabic import TRANSLATE_URL, fill_missing_arabic
+
+# Bump when a stage's logic changes so the next run reprocesses every row
+PIPELINE_VERSION = 2
+
+STATE_DIR = Path('.pipeline')
+KEY = 'Title'
+
+
+# Each stage takes the frame of new/changed rows plus the run context and
+# returns the (possibly updated) frame. context['kept'] holds the previous
+# output for rows that did not change.
+
+def stage_products(rows, context):
+    """process_unique_products: source rows -> 265 test rows"""
+    # Products seen before keep the barcode they were given last time
+    previous = context['previous']
+    source = rows.copy()
+    missing = source['Variant Barcode'].isna() & source.index.isin(previous.index)
+    source.loc[missing, 'Variant Barcode'] = previous.loc[source.index[missing], 'Barcode']
+    return build_products(source)
+
+
+def stage_barcodes(rows, context):
+    """fix_duplicate_barcodes: new barcodes for duplicates within the changed
+    rows or against unchanged rows"""
+    fixed, _ = reassign_duplicate_barcodes(rows, reserved=context['kept']['Barcode'])
+    return fixed
+
+
+def stage_leading_zeros(rows, context):
+    """final_excel_fix: restore leading zeros lost to numeric barcodes"""
+    restore_leading_zeros(rows)
+    return rows
+
+
+def stage_images(rows, context):
+    """download_final_images: fetch images for the changed rows"""
+    download_product_images(rows)
+    return rows
+
+
+def stage_translate(rows, context):
+    """translate_to_arabic: translate missing Arabic titles"""
+    fill_missing_arabic(rows, url=context['translate_url'])
+    return rows
+
+
+# name -> (upstream stages, stage function)
+STAGES = {
+    'products': ([], stage_products),
+    'barcodes': (['products'], stage_barcodes),
+    'leading_zeros': (['barcodes'], stage_leading_zeros),
+    'images': (['leading_zeros'], stage_images),
+    'translate': (['products'], stage_translate),
+}
+
+
+def stage_order(stages=STAGES):
+    """Topological order of the stage DAG (ties broken by declaration order)"""
+    remaining = {name: set(deps) for name, (deps, _) in stages.items()}
+    order = []
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"pipeline stages have a cycle: {sorted(remaining)}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def row_hashes(unique_products):
+    """Content hash of each product's source columns, keyed by KEY"""
+    hashes = pd.util.hash_pandas_object(unique_products[SOURCE_COLUMNS], index=False)
+    return hashes.map('{:016x}'.format)
+
+
+def load_state(state_dir):
+    """Return (manifest hashes, previous output) from the last run"""
+    manifest_path = state_dir / 'manifest.json'
+    output_path = state_dir / 'products.pkl'
+    if not manifest_path.exists() or not output_path.exists():
+        return pd.Series(dtype=object), None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != PIPELINE_VERSION:
+        print(f"ℹ️  Pipeline version changed ({manifest.get('version')} → {PIPELINE_VERSION}), reprocessing everything")
+        return pd.Series(dtype=object), None
+    return pd.Series(manifest['hashes'], dtype=object), pd.read_pickle(output_path)
+
+
+def save_state(state_dir, hashes, output):
+    state_dir.mkdir(exist_ok=True)
+    output.to_pickle(state_dir / 'products.pkl')
+    manifest_tmp = state_dir / 'manifest.json.tmp'
+    with open(manifest_tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': PIPELINE_VERSION, 'hashes': hashes.to_dict()}, f, ensure_ascii=False)
+    manifest_tmp.replace(state_dir / 'manifest.json')
+
+
+def run(csv_file='265.csv', output='265 test.xlsx', state_dir=STATE_DIR, full=False, chunksize=DEFAULT_CHUNKSIZE,
+        translate_url=TRANSLATE_URL):
+    """Run the 265 workflow, pushing only new or changed products through it"""
+    start = time.perf_counter()
+    state_dir = Path(state_dir)
+    output = Path(output)
+
+    print(f"📖 Reading {csv_file}...")
+    unique_products, _ = load_unique_products(csv_file, chunksize)
+    unique_products = unique_products.set_index(KEY, drop=False)
+    hashes = row_hashes(unique_products)
+
+    old_hashes, previous = (pd.Series(dtype=object), None) if full else load_state(state_dir)
+    if previous is None:
+        previous = pd.DataFrame(columns=['English Title', 'Arabic Title', 'Price', 'Barcode', 'Image URL'])
+
+    changed = hashes.ne(old_hashes.reindex(hashes.index)) | ~hashes.index.isin(previous.index)
+    removed = previous.index.difference(hashes.index)
+    kept = previous.loc[hashes.index[~changed]]
+    rows = unique_products[changed]
+
+    print(f"📊 {len(hashes)} products: {len(rows)} new/changed, {len(kept)} unchanged, {len(removed)} removed")
+
+    if rows.empty and removed.empty and output.exists():
+        print("✅ Nothing changed since the last run")
+        return previous
+
+    context = {'kept': kept, 'previous': previous, 'translate_url': translate_url}
+    for name in stage_order():
+        if rows.empty:
+            break
+        with metrics.stage(name, rows=len(rows)):
+            rows = STAGES[name][1](rows, context)
+
+    result = pd.concat([kept, rows]) if len(kept) else rows
+    result = result.reindex(hashes.index)
+
+    save_catalog(result, output)
+    save_state(state_dir, hashes, result)
+    print(f"✅ Wrote {output} with {len(result)} products in {time.perf_counter() - start:.2f}s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental runner for the 265 workflow")
+    parser.add_argument('--csv', default='265.csv', help="Shopify export to process")
+    parser.add_argument('--output', default='265 test.xlsx', help="Excel file to write")
+    parser.add_argument('--state-dir', default=str(STATE_DIR), help="Where the row-hash manifest is kept")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest and reprocess every product")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--translate-url', default=TRANSLATE_URL, help="Translation endpoint")
+    args = parser.parse_args()
+    run(args.csv, args.output, args.state_dir, args.full, args.chunksize, args.translate_url)
@@ -1,9 +1,22 @@
+import argparse
 import pandas as pd
-import random
 import re
 
+from barcode_registry import allocate_barcodes, register_barcodes
+from catalog_store import save_catalog
+from metrics import metrics
+from product_dedup import apply_merge_decisions, find_duplicates
+from shopify_export import DEFAULT_CHUNKSIZE, first_per_group
+from title_parsing import split_titles
+
+SOURCE_COLUMNS = ['Title', 'Variant Price', 'Variant Barcode', 'Image Src']
+
 def extract_titles_from_combined(title_text):
-    """Extract English and Arabic titles from combined title text"""
+    """Extract English and Arabic titles from combined title text
+
+    Per-row reference implementation; main() uses the vectorized
+    title_parsing.split_titles (see bench_title_parsing.py).
+    """
     if pd.isna(title_text) or not isinstance(title_text, str):
         return "", ""
     
@@ -24,11 +37,6 @@ def extract_titles_from_combined(title_text):
     
     return english_title, arabic_title
 
-def generate_barcode():
-    """Generate a 12-digit barcode starting with 01"""
-    remaining_digits = ''.join([str(random.randint(0, 9)) for _ in range(10)])
-    return f"01{remaining_digits}"
-
 def clean_barcode(existing_barcode):
     """Clean and validate existing barcode"""
     if pd.isna(existing_barcode):
@@ -41,51 +49,59 @@ def clean_barcode(existing_barcode):
         return barcode_clean
     return None
 
-def main():
-    print("Loading 265.csv...")
-    df = pd.read_csv('265.csv')
+def load_unique_products(csv_file='265.csv', chunksize=DEFAULT_CHUNKSIZE):
+    """Stream the export and keep the first occurrence of each unique title
+
+    Returns (unique products frame, total rows read).
+    """
+    # Group by title and take the first occurrence of each unique product,
+    # one chunk at a time so memory does not grow with the export size
+    unique_products, total_rows = first_per_group(csv_file, 'Title', chunksize, usecols=SOURCE_COLUMNS)
+    return unique_products.reset_index(), total_rows
+
+def build_products(unique_products):
+    """Turn unique source products into 265 test rows"""
+    # Extract English and Arabic titles for all products at once
+    english_titles, arabic_titles = split_titles(unique_products['Title'])
     
-    print(f"Total rows: {len(df)}")
-    print(f"Unique titles: {df['Title'].nunique()}")
+    # Keep existing barcodes and allocate unique ones for the rest
+    barcodes = unique_products['Variant Barcode'].map(clean_barcode).astype(object)
+    missing = barcodes.isna()
+    register_barcodes(barcodes[~missing], project='265')
+    barcodes[missing] = allocate_barcodes(int(missing.sum()), project='265')
     
-    # Group by title and take the first occurrence of each unique product
-    unique_products = df.groupby('Title').first().reset_index()
+    # Create DataFrame with processed unique products
+    return pd.DataFrame({
+        'English Title': english_titles,
+        'Arabic Title': arabic_titles,
+        'Price': pd.to_numeric(unique_products['Variant Price'], errors='coerce').fillna(0.0),
+        'Barcode': barcodes.values,
+        'Image URL': unique_products['Image Src'].fillna(""),
+    }, index=unique_products.index)
+
+def main(csv_file='265.csv', chunksize=DEFAULT_CHUNKSIZE, dedup=False):
+    print(f"Streaming {csv_file} in chunks of {chunksize} rows...")
     
-    print(f"After removing duplicates: {len(unique_products)} unique products")
+    with metrics.stage('load'):
+        unique_products, total_rows = load_unique_products(csv_file, chunksize)
+    metrics.inc('rows_read_total', total_rows, stage='load')
     
-    processed_data = []
+    print(f"Total rows: {total_rows}")
+    print(f"Unique titles: {len(unique_products)}")
     
-    for idx, row in unique_products.iterrows():
-        if idx % 50 == 0:
-            print(f"Processing unique product {idx + 1}/{len(unique_products)}")
-        
-        # Extract English and Arabic titles
-        english_title, arabic_title = extract_titles_from_combined(row['Title'])
-        
-        # Get price
-        price = row['Variant Price'] if pd.notna(row['Variant Price']) else 0.0
-        
-        # Get or generate barcode
-        existing_barcode = row['Variant Barcode']
-        cleaned_barcode = clean_barcode(existing_barcode)
-        barcode = cleaned_barcode if cleaned_barcode else generate_barcode()
-        
-        # Get image URL
-        image_url = row['Image Src'] if pd.notna(row['Image Src']) else ""
-        
-        processed_data.append({
-            'English Title': english_title,
-            'Arabic Title': arabic_title,
-            'Price': price,
-            'Barcode': barcode,
-            'Image URL': image_url
-        })
+    if dedup:
+        # Spelling / spacing / casing variants of the same product, same barcode or image
+        with metrics.stage('dedup', rows=len(unique_products)):
+            decisions = find_duplicates(unique_products)
+            unique_products = apply_merge_decisions(unique_products, decisions).reset_index(drop=True)
+        print(f"Near-duplicates merged: {len(decisions)}")
+    print(f"After removing duplicates: {len(unique_products)} unique products")
     
-    # Create DataFrame with processed unique products
-    result_df = pd.DataFrame(processed_data)
+    with metrics.stage('build_products', rows=len(unique_products)):
+        result_df = build_products(unique_products)
     
     print("Saving to 265 test.xlsx...")
-    result_df.to_excel('265 test.xlsx', index=False)
+    save_catalog(result_df, '265 test.xlsx')
     
     print("Preview of processed unique products:")
     print(result_df.head().to_string(index=False))
@@ -98,4 +114,7 @@ def main():
     return result_df
 
 if __name__ == "__main__":
-    df = main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create 265 test.xlsx from 265.csv")
+    parser.add_argument('--dedup', action='store_true', help="Also merge near-duplicate products (see product_dedup.py)")
+    args = parser.parse_args()
+    df = main(dedup=args.dedup)
\ No newline at end of file
@@ -0,0 +1,286 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from shopify_export import DEFAULT_CHUNKSIZE, ShopifyExport, products_frame
+from title_parsing import split_titles
+
+# MinHash signature length and its split into LSH bands. Two titles become
+# candidates when all rows of any band agree, which happens with high
+# probability above a Jaccard similarity of about (1/BANDS) ** (1/ROWS).
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+
+# Estimated Jaccard similarity (of title character trigrams) needed to merge
+TITLE_THRESHOLD = 0.8
+# Lower bar for products that already share an image URL
+IMAGE_THRESHOLD = 0.5
+
+# Bucket neighbours each row is compared with (besides the bucket's first row)
+BUCKET_WINDOW = 2
+
+# Titles are compared on their first MAX_CHARS normalized characters
+MAX_CHARS = 96
+
+# Rows hashed per numpy block (bounds memory at about 60 MB per block)
+BLOCK_ROWS = 20_000
+
+DECISIONS_FILE = 'dedup_decisions.csv'
+
+# Arabic letter variants folded to one form, diacritics and tatweel removed,
+# Arabic-Indic digits turned into ASCII digits
+ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه', 'ـ': None,
+    **{chr(code): None for code in range(0x064B, 0x0653)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+
+
+def normalize_text(texts):
+    """Lowercase, fold Arabic letter variants, drop punctuation, collapse spaces"""
+    texts = texts.astype(object).fillna('').str.lower().str.translate(ARABIC_FOLD)
+    texts = texts.str.replace(r'[^\w\s.]|(?<!\d)\.|\.(?!\d)', ' ', regex=True)
+    return texts.str.split().str.join(' ').fillna('')
+
+
+def normalize_titles(titles):
+    """Normalized (English, Arabic) parts of "English || Arabic" titles"""
+    english, arabic = split_titles(titles.fillna('').astype(str))
+    return normalize_text(english), normalize_text(arabic)
+
+
+def numeric_tokens(texts):
+    """Distinct numbers in each text, sorted; titles with different numbers
+    (sizes, pack counts, models) are never merged"""
+    return texts.str.findall(r'\d+(?:\.\d+)?').map(lambda numbers: ' '.join(sorted(set(numbers))))
+
+
+def normalize_barcodes(barcodes):
+    """Digits only, without leading zeros (a UPC-A and its EAN-13 form match)"""
+    digits = barcodes.fillna('').astype(str).str.replace(r'\D', '', regex=True).str.lstrip('0')
+    return digits.where(digits.str.len() >= 7, '')
+
+
+def normalize_image_urls(urls):
+    """Scheme and query string stripped, so CDN cache-busting does not matter"""
+    return urls.fillna('').astype(str).str.replace(r'^https?://|[?#].*$', '', regex=True)
+
+
+def minhash_signatures(texts, num_hashes=NUM_HASHES, seed=1):
+    """MinHash signatures (len(texts) x num_hashes uint32) of character trigrams
+
+    Texts are laid out as fixed-width code point arrays, so hashing runs as
+    numpy operations over blocks of rows instead of a Python loop per title.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 63, num_hashes, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2 ** 63, num_hashes, dtype=np.uint64)
+    padded = [f'  {text}  ' for text in texts]
+    signatures = np.empty((len(padded), num_hashes), dtype=np.uint32)
+    for start in range(0, len(padded), BLOCK_ROWS):
+        block = np.array(padded[start:start + BLOCK_ROWS], dtype=f'U{MAX_CHARS}')
+        codes = block.view(np.uint32).reshape(len(block), MAX_CHARS).astype(np.uint64)
+        grams = (codes[:, :-2] << np.uint64(42)) ^ (codes[:, 1:-1] << np.uint64(21)) ^ codes[:, 2:]
+        # Trigrams running into the padding past the end of a title are masked out
+        valid = codes[:, 2:] != 0
+        valid[:, 0] = True
+        for i in range(num_hashes):
+            hashed = (grams * multipliers[i] + offsets[i]) >> np.uint64(32)
+            hashed[~valid] = np.uint64(2 ** 32 - 1)
+            signatures[start:start + len(block), i] = hashed.min(axis=1)
+    return signatures
+
+
+def unique_pairs(pairs):
+    """Distinct rows of an (m, 2) array of row numbers (hashing one int64
+    per pair is much faster than np.unique(axis=0))"""
+    if not len(pairs):
+        return pairs.reshape(0, 2).astype(np.int64)
+    size = np.int64(pairs.max()) + 1
+    codes = pd.unique(pairs[:, 0].astype(np.int64) * size + pairs[:, 1])
+    return np.column_stack([codes // size, codes % size])
+
+
+def lsh_candidates(signatures, bands=BANDS, window=BUCKET_WINDOW):
+    """Candidate pairs (i, j) from rows that share a bucket in any band
+
+    Every member of a bucket is paired with the bucket's first row and the
+    `window` members before it rather than with every other member, so a
+    large bucket costs linear time.
+    """
+    rows = signatures.shape[1] // bands
+    mixers = np.random.default_rng(2).integers(1, 2 ** 63, rows, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    for band in range(bands):
+        band_values = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (band_values * mixers).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        first_of_bucket = order[np.flatnonzero(starts)[np.cumsum(starts) - 1]]
+        members = first_of_bucket != order
+        pairs.append(np.column_stack([first_of_bucket[members], order[members]]))
+        for offset in range(1, window + 1):
+            same = sorted_keys[offset:] == sorted_keys[:-offset]
+            pairs.append(np.column_stack([order[:-offset][same], order[offset:][same]]))
+    return unique_pairs(np.concatenate(pairs))
+
+
+def similarity(signatures, pairs):
+    """Estimated Jaccard similarity for each candidate pair"""
+    if not len(pairs):
+        return np.empty(0)
+    return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+
+def block_pairs(keys):
+    """Pairs (first row, row) for rows sharing a non-empty key"""
+    keys = np.asarray(keys, dtype=object)
+    codes, _ = pd.factorize(keys)
+    first = np.unique(codes, return_index=True)[1][codes]
+    rows = np.arange(len(keys))
+    duplicated = (first != rows) & (keys != '')
+    return np.column_stack([first[duplicated], rows[duplicated]]).astype(np.int64)
+
+
+class TitleIndex:
+    """MinHash signatures for one normalized title column
+
+    Identical titles share one signature; empty titles never match.
+    """
+
+    def __init__(self, titles):
+        self.ids, unique = pd.factorize(titles.to_numpy(dtype=object))
+        self.signatures = minhash_signatures(unique)
+        self.empty = unique == ''
+        self.first_row = np.unique(self.ids, return_index=True)[1]
+
+    def similarity(self, pairs):
+        a, b = self.ids[pairs[:, 0]], self.ids[pairs[:, 1]]
+        scores = similarity(self.signatures, np.column_stack([a, b]))
+        return np.where(self.empty[a] | self.empty[b], 0.0, scores)
+
+    def candidates(self):
+        """Row pairs with identical titles plus LSH candidates between distinct titles"""
+        exact = block_pairs(np.where(self.empty[self.ids], '', self.ids.astype(str)))
+        pairs = lsh_candidates(self.signatures) if len(self.empty) > 1 else np.empty((0, 2), dtype=np.int64)
+        pairs = pairs[~(self.empty[pairs[:, 0]] | self.empty[pairs[:, 1]])]
+        return np.concatenate([exact, self.first_row[pairs]])
+
+
+def find_duplicates(products, title_column='Title', barcode_column='Variant Barcode', image_column='Image Src',
+                    threshold=TITLE_THRESHOLD, image_threshold=IMAGE_THRESHOLD):
+    """Find products that are the same item under different rows
+
+    Three sources of evidence, all in (near) linear time:
+      barcode  same vendor barcode
+      image    same image URL and titles at least `image_threshold` similar
+      title    English or Arabic titles at least `threshold` similar
+               (MinHash/LSH on the normalized title parts)
+    Image and title matches need the same numbers in both titles and are
+    rejected when both products carry different barcodes. Groups are never
+    merged if that would put two different barcodes in one group, even
+    through rows without a barcode. Returns one merge
+    decision per duplicate row: the row label, the label of the row to keep
+    (the first one of its group), the reason and the estimated similarity.
+    """
+    n = len(products)
+    labels = products.index
+    english, arabic = normalize_titles(products[title_column])
+    numbers = numeric_tokens(english + ' ' + arabic).to_numpy()
+    barcodes = normalize_barcodes(products[barcode_column]) if barcode_column in products else pd.Series('', index=labels)
+    barcodes = barcodes.to_numpy()
+    images = normalize_image_urls(products[image_column]) if image_column in products else pd.Series('', index=labels)
+
+    indexes = [TitleIndex(english), TitleIndex(arabic)]
+
+    def title_similarity(pairs):
+        return np.maximum(*(index.similarity(pairs) for index in indexes))
+
+    def compatible(pairs):
+        a, b = pairs[:, 0], pairs[:, 1]
+        same_numbers = numbers[a] == numbers[b]
+        barcode_conflict = (barcodes[a] != '') & (barcodes[b] != '') & (barcodes[a] != barcodes[b])
+        return same_numbers & ~barcode_conflict
+
+    title_pairs = unique_pairs(np.concatenate([index.candidates() for index in indexes]))
+
+    evidence = []
+    barcode_pairs = block_pairs(barcodes)
+    evidence.append((barcode_pairs, 'barcode', title_similarity(barcode_pairs)))
+    image_pairs = block_pairs(images)
+    scores = title_similarity(image_pairs)
+    keep = (scores >= image_threshold) & compatible(image_pairs)
+    evidence.append((image_pairs[keep], 'image', scores[keep]))
+    scores = title_similarity(title_pairs)
+    keep = (scores >= threshold) & compatible(title_pairs)
+    evidence.append((title_pairs[keep], 'title', scores[keep]))
+
+    parent = list(range(n))
+    # Vendor barcode of each group ('' if none), kept on its root
+    group_barcode = barcodes.tolist()
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    reasons = {}
+    for pairs, reason, scores in evidence:
+        for (a, b), score in zip(pairs.tolist(), scores.tolist()):
+            root_a, root_b = find(a), find(b)
+            if root_a == root_b:
+                continue
+            code_a, code_b = group_barcode[root_a], group_barcode[root_b]
+            if code_a and code_b and code_a != code_b:
+                continue
+            # The lower row number stays the root, so each group keeps its first row
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            parent[root_b] = root_a
+            group_barcode[root_a] = code_a or code_b
+            reasons[root_b] = (reason, round(score, 3))
+
+    # A row stops being a root exactly once, when its group is merged
+    rows = sorted(reasons)
+    return pd.DataFrame({
+        'row': labels[rows],
+        'keep': labels[[find(i) for i in rows]],
+        'reason': [reasons[i][0] for i in rows],
+        'similarity': [reasons[i][1] for i in rows],
+    })
+
+
+def apply_merge_decisions(products, decisions):
+    """Drop the rows that find_duplicates merged into another row"""
+    return products.drop(index=decisions['row'], errors='ignore')
+
+
+def load_products(csv_file, chunksize=DEFAULT_CHUNKSIZE):
+    """First row of every Handle in a Shopify export"""
+    products = products_frame(list(ShopifyExport(csv_file, chunksize).products()))
+    return products[['Handle', 'Title', 'Variant Barcode', 'Image Src']].set_index('Handle')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate products in a Shopify export")
+    parser.add_argument('csv_file', help="Shopify products export")
+    parser.add_argument('--output', default=DECISIONS_FILE, help="Merge decisions CSV")
+    parser.add_argument('--threshold', type=float, default=TITLE_THRESHOLD, help="Title similarity to merge (0-1)")
+    args = parser.parse_args()
+
+    print(f"📖 Reading {args.csv_file}...")
+    products = load_products(args.csv_file)
+    print(f"🔍 Looking for duplicates among {len(products)} products...")
+    decisions = find_duplicates(products, threshold=args.threshold)
+    decisions = decisions.rename(columns={'row': 'Handle', 'keep': 'Keep Handle'})
+    decisions['Title'] = products.loc[decisions['Handle'], 'Title'].values
+    decisions['Keep Title'] = products.loc[decisions['Keep Handle'], 'Title'].values
+    decisions.to_csv(args.output, index=False, encoding='utf-8-sig')
+    for reason, count in decisions['reason'].value_counts().items():
+        print(f"  🔁 {count} duplicates by {reason}")
+    print(f"💾 Wrote {len(decisions)} merge decisions to {Path(args.output).as_posix()}")
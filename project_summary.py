@@ -1,88 +1,190 @@
-import pandas as pd
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def generate_project_summary():
-    """Generate a comprehensive summary of both Crayola and Deli projects"""
-    
+from barcode_registry import generated_barcodes
+from brands import BRANDS
+from catalog_store import catalog_exists, catalog_path, read_catalog_columns
+from image_manifest import MANIFEST_NAME, load_manifest
+
+CACHE_FILE = Path('.summary_cache.json')
+SUMMARY_JSON = 'project_summary.json'
+
+# Bump when brand_metrics changes so cached results are recomputed
+METRICS_VERSION = 2
+
+BRAND_ICONS = {'crayola': '🎨', 'deli': '📁'}
+
+
+def brand_paths(config):
+    brand_dir = Path(config['output_dir'])
+    return brand_dir / config['excel_name'], brand_dir / 'images'
+
+
+def input_signature(config):
+    """Cheap fingerprint of a brand's inputs (size and mtime of the catalog
+    files, the image folder and its manifest)"""
+    excel_file, images_dir = brand_paths(config)
+    signature = [METRICS_VERSION]
+    for path in (excel_file, catalog_path(excel_file), images_dir, images_dir / MANIFEST_NAME):
+        try:
+            stat = path.stat()
+            signature.append([str(path), stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            signature.append([str(path), None, None])
+    return signature
+
+
+def _number(value):
+    return None if value is None else round(value, 2)
+
+
+def brand_metrics(config):
+    """Product, image, price and barcode metrics for one brand project
+
+    Runs in a worker process; returns None if the project has no catalog.
+    Only the barcode and price columns are read, without pandas when the
+    catalog has a Parquet copy. Generated barcodes are the ones the barcode
+    registry allocated for the brand's project (its output_dir).
+    """
+    excel_file, images_dir = brand_paths(config)
+    if not catalog_exists(excel_file):
+        return None
+    columns = read_catalog_columns(excel_file, ['barcode', 'price'])
+    extensions = ('.jpg', *config['image_extensions'])
+    image_barcodes = load_manifest(images_dir).barcodes(extensions) if images_dir.is_dir() else set()
+
+    barcodes = [str(barcode) for barcode in columns['barcode'] if barcode is not None]
+    generated_codes = generated_barcodes(barcodes, project=config['output_dir'])
+    generated = sum(barcode in generated_codes for barcode in barcodes)
+    prices = [float(price) for price in columns['price'] if price is not None and not math.isnan(float(price))]
+    products = len(columns['barcode'])
+    return {
+        'products': products,
+        'images': len(image_barcodes),
+        'image_coverage': round(len(image_barcodes) / products * 100, 1) if products else 0.0,
+        'missing_images': len(set(barcodes) - image_barcodes),
+        'price_min': _number(min(prices, default=None)),
+        'price_max': _number(max(prices, default=None)),
+        'price_mean': _number(math.fsum(prices) / len(prices) if prices else None),
+        'existing_barcodes': len(barcodes) - generated,
+        'generated_barcodes': generated,
+    }
+
+
+def load_cache(cache_file):
+    if cache_file.exists():
+        with open(cache_file, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache_file, cache):
+    tmp_path = cache_file.with_name(cache_file.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_file)
+
+
+def collect_metrics(brands=BRANDS, max_workers=None, cache_file=CACHE_FILE, use_cache=True):
+    """Metrics for every brand, computing the stale ones in parallel processes
+
+    Results are cached in `cache_file` keyed by input_signature, so a brand
+    whose catalog and images did not change is not recomputed. Returns
+    ({brand: metrics or None}, number of brands served from cache).
+    """
+    cache = load_cache(cache_file) if use_cache else {}
+    results = {}
+    stale = []
+    for brand, config in brands.items():
+        cached = cache.get(brand)
+        if cached and cached['signature'] == input_signature(config):
+            results[brand] = cached['metrics']
+        else:
+            stale.append(brand)
+
+    if len(stale) == 1:
+        # Not worth starting a worker process for a single brand
+        results[stale[0]] = brand_metrics(brands[stale[0]])
+    elif stale:
+        workers = min(max_workers or os.cpu_count() or 1, len(stale))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for brand, metrics in zip(stale, pool.map(brand_metrics, [brands[b] for b in stale])):
+                results[brand] = metrics
+
+    if stale:
+        # Signatures are taken after computing, since refreshing a manifest rewrites it
+        for brand in stale:
+            cache[brand] = {'signature': input_signature(brands[brand]), 'metrics': results[brand]}
+        save_cache(cache_file, cache)
+
+    return {brand: results[brand] for brand in brands}, len(brands) - len(stale)
+
+
+def print_brand(brand, config, metrics):
+    print(f"\n{BRAND_ICONS.get(brand, '📦')} {config['display_name'].upper()} PROJECT")
+    print("-" * 30)
+    if metrics is None:
+        print(f"❌ {config['display_name']} project not found")
+        return
+    print(f"✅ Products: {metrics['products']}")
+    print(f"✅ Images: {metrics['images']}")
+    print(f"✅ Image Coverage: {metrics['image_coverage']:.1f}%")
+    if metrics['price_min'] is not None:
+        print(f"💰 Price Range: {metrics['price_min']:.2f} - {metrics['price_max']:.2f}")
+        print(f"💰 Average Price: {metrics['price_mean']:.2f}")
+    print(f"📊 Existing Barcodes: {metrics['existing_barcodes']}")
+    print(f"📊 Generated Barcodes: {metrics['generated_barcodes']}")
+
+
+def generate_project_summary(max_workers=None, json_file=SUMMARY_JSON, use_cache=True):
+    """Generate a summary of every brand project in BRANDS"""
+    start = time.perf_counter()
+
     print("📊 PROJECT SUMMARY REPORT")
     print("=" * 50)
-    
-    # Crayola Project Summary
-    print("\n🎨 CRAYOLA PROJECT")
-    print("-" * 30)
-    
-    crayola_dir = Path('crayola')
-    crayola_excel = crayola_dir / 'crayola_products.xlsx'
-    crayola_images = crayola_dir / 'images'
-    
-    if crayola_excel.exists():
-        df_crayola = pd.read_excel(crayola_excel)
-        crayola_image_files = list(crayola_images.glob('*.jpg')) + list(crayola_images.glob('*.png'))
-        
-        print(f"✅ Products: {len(df_crayola)}")
-        print(f"✅ Images: {len(crayola_image_files)}")
-        print(f"✅ Image Coverage: {len(crayola_image_files)/len(df_crayola)*100:.1f}%")
-        print(f"💰 Price Range: {df_crayola['price'].min():.2f} - {df_crayola['price'].max():.2f}")
-        print(f"💰 Average Price: {df_crayola['price'].mean():.2f}")
-        
-        # Check barcode types
-        existing_barcodes = df_crayola[df_crayola['barcode'].astype(str).str.startswith('69')]
-        generated_barcodes = df_crayola[df_crayola['barcode'].astype(str).str.startswith('01')]
-        
-        print(f"📊 Existing Barcodes: {len(existing_barcodes)}")
-        print(f"📊 Generated Barcodes: {len(generated_barcodes)}")
-    else:
-        print("❌ Crayola project not found")
-    
-    # Deli Project Summary
-    print("\n📁 DELI PROJECT")
-    print("-" * 30)
-    
-    deli_dir = Path('deli')
-    deli_excel = deli_dir / 'deli_products.xlsx'
-    deli_images = deli_dir / 'images'
-    
-    if deli_excel.exists():
-        df_deli = pd.read_excel(deli_excel)
-        deli_image_files = list(deli_images.glob('*.jpg')) + list(deli_images.glob('*.png')) + list(deli_images.glob('*.webp'))
-        
-        print(f"✅ Products: {len(df_deli)}")
-        print(f"✅ Images: {len(deli_image_files)}")
-        print(f"✅ Image Coverage: {len(deli_image_files)/len(df_deli)*100:.1f}%")
-        print(f"💰 Price Range: {df_deli['price'].min():.2f} - {df_deli['price'].max():.2f}")
-        print(f"💰 Average Price: {df_deli['price'].mean():.2f}")
-        
-        # Check barcode types
-        existing_barcodes = df_deli[df_deli['barcode'].astype(str).str.startswith('69')]
-        generated_barcodes = df_deli[df_deli['barcode'].astype(str).str.startswith('01')]
-        
-        print(f"📊 Existing Barcodes: {len(existing_barcodes)}")
-        print(f"📊 Generated Barcodes: {len(generated_barcodes)}")
-    else:
-        print("❌ Deli project not found")
-    
+
+    metrics, cached = collect_metrics(BRANDS, max_workers, use_cache=use_cache)
+    for brand, config in BRANDS.items():
+        print_brand(brand, config, metrics[brand])
+
     # Overall Summary
     print("\n📋 OVERALL SUMMARY")
     print("-" * 30)
-    
-    total_products = 0
-    total_images = 0
-    
-    if crayola_excel.exists():
-        total_products += len(df_crayola)
-        total_images += len(crayola_image_files)
-    
-    if deli_excel.exists():
-        total_products += len(df_deli)
-        total_images += len(deli_image_files)
-    
+
+    found = [m for m in metrics.values() if m is not None]
+    total_products = sum(m['products'] for m in found)
+    total_images = sum(m['images'] for m in found)
+    coverage = round(total_images / total_products * 100, 1) if total_products else 0.0
+
     print(f"✅ Total Products: {total_products}")
     print(f"✅ Total Images: {total_images}")
-    print(f"✅ Overall Image Coverage: {total_images/total_products*100:.1f}%")
-    
-    print("\n🎉 Both projects completed successfully!")
-    print("📁 Check the 'crayola/' and 'deli/' folders for the Excel files and images.")
+    print(f"✅ Overall Image Coverage: {coverage:.1f}%")
 
-if __name__ == "__main__":
-    generate_project_summary()
+    summary = {
+        'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'brands': metrics,
+        'totals': {'brands': len(found), 'products': total_products, 'images': total_images,
+                   'image_coverage': coverage},
+    }
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Wrote {json_file}")
+
+    print(f"\n🎉 Summarized {len(found)} of {len(BRANDS)} projects in {time.perf_counter() - start:.2f}s "
+          f"({cached} from cache)")
+    return summary
 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize every brand project")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--json', default=SUMMARY_JSON, help="Machine-readable summary output ('' to skip)")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every brand")
+    args = parser.parse_args()
+    generate_project_summary(args.workers, args.json, not args.no_cache)
@@ -1,18 +1,24 @@
-import pandas as pd
 from pathlib import Path
 
+from catalog_store import catalog_exists, load_catalog, save_catalog
+from text_cleanup import clean_text_columns
+
 def replace_ampersand():
-    """Replace A&amp;T with A&T in 265 test.xlsx"""
+    """Clean HTML entities and tags (A&amp;T -> A&T, ...) in 265 test.xlsx
+
+    New catalogs are cleaned when the export is read; this fixes catalogs
+    built before that.
+    """
     
-    print("Replacing A&amp;T with A&T in 265 test.xlsx...")
+    print("Cleaning HTML entities and tags in 265 test.xlsx...")
     
     # Load the Excel file
     excel_file = Path('list/excel/265 test.xlsx')
-    if not excel_file.exists():
+    if not catalog_exists(excel_file):
         print("❌ list/excel/265 test.xlsx file not found!")
         return
     
-    df = pd.read_excel(excel_file)
+    df = load_catalog(excel_file)
     print(f"✅ Loaded 265 test.xlsx with {len(df)} products")
     print(f"📋 Current columns: {df.columns.tolist()}")
     
@@ -20,27 +26,18 @@ def replace_ampersand():
     print(f"\n📊 Sample data before replacement:")
     print(df.head(3).to_string(index=False))
     
-    # Count occurrences before replacement
-    total_replacements = 0
-    columns_with_replacements = []
-    
-    # Replace A&amp;T with A&T in all text columns
-    for column in df.columns:
-        if df[column].dtype == 'object':  # Only text columns
-            before_count = df[column].astype(str).str.contains('A&amp;T', na=False).sum()
-            if before_count > 0:
-                df[column] = df[column].astype(str).str.replace('A&amp;T', 'A&T', regex=False)
-                after_count = df[column].astype(str).str.contains('A&amp;T', na=False).sum()
-                replacements_in_column = before_count - after_count
-                total_replacements += replacements_in_column
-                columns_with_replacements.append((column, replacements_in_column))
-                print(f"✅ Column '{column}': {replacements_in_column} replacements")
+    # Unescape entities and strip tags in the title columns in one pass
+    # (Image URL and Barcode are left exactly as they are)
+    columns_with_replacements = clean_text_columns(df, ['English Title', 'Arabic Title'])
+    total_replacements = sum(count for _, count in columns_with_replacements)
+    for column, count in columns_with_replacements:
+        print(f"✅ Column '{column}': {count} replacements")
     
     print(f"\n✅ Total replacements made: {total_replacements}")
     
     if total_replacements > 0:
         # Save the updated Excel file
-        df.to_excel(excel_file, index=False)
+        save_catalog(df, excel_file)
         print(f"✅ Updated {excel_file}")
         
         # Show sample after replacement
@@ -54,7 +51,7 @@ def replace_ampersand():
         for column, count in columns_with_replacements:
             print(f"  - {column}: {count} replacements")
     else:
-        print("ℹ️  No 'A&amp;T' found in the file - no replacements needed")
+        print("ℹ️  No HTML entities or tags found in the file - no replacements needed")
 
 if __name__ == "__main__":
     replace_ampersand()
@@ -0,0 +1,223 @@
+import sys
+from collections import Counter
+
+import pandas as pd
+
+from text_cleanup import clean_text_columns
+
+# Rows per chunk; peak memory is bounded by this rather than the export size
+DEFAULT_CHUNKSIZE = 50_000
+
+PRODUCT_FIELDS = {
+    'handle': 'Handle', 'title': 'Title', 'body_html': 'Body (HTML)', 'vendor': 'Vendor',
+    'category': 'Product Category', 'tags': 'Tags', 'status': 'Status',
+}
+VARIANT_FIELDS = {
+    'sku': 'Variant SKU', 'barcode': 'Variant Barcode', 'price': 'Variant Price',
+    'compare_at_price': 'Variant Compare At Price', 'grams': 'Variant Grams',
+    'inventory_qty': 'Variant Inventory Qty', 'requires_shipping': 'Variant Requires Shipping',
+    'taxable': 'Variant Taxable', 'image': 'Variant Image',
+}
+OPTION_NAMES = ('Option1 Name', 'Option2 Name', 'Option3 Name')
+OPTION_VALUES = ('Option1 Value', 'Option2 Value', 'Option3 Value')
+IMAGE_FIELDS = ('Image Src', 'Image Position', 'Image Alt Text')
+
+# Short values repeated on most rows share one string object
+INTERNED = {'Vendor', 'Product Category', 'Tags', 'Status', 'Variant Requires Shipping', 'Variant Taxable',
+            *OPTION_NAMES, 'Image Position'}
+
+# Descriptive text cleaned of HTML on read; handles, SKUs, barcodes and URLs
+# are identifiers and stay byte-exact
+CLEANED_COLUMNS = ('Title', 'Body (HTML)', 'Tags', 'Vendor', 'Product Category', 'Image Alt Text')
+
+EXPORT_COLUMNS = {*PRODUCT_FIELDS.values(), *VARIANT_FIELDS.values(), *OPTION_NAMES, *OPTION_VALUES, *IMAGE_FIELDS}
+
+
+def read_export_chunks(path, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    """Yield a Shopify export as DataFrame chunks
+
+    Every column is read as text so barcodes keep their leading zeros and a
+    column's dtype cannot change from one chunk to the next; convert numeric
+    columns with pd.to_numeric where needed.
+    """
+    with pd.read_csv(path, chunksize=chunksize, usecols=usecols, dtype=str) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+class Variant:
+    """One purchasable variant; values are the export's text (None if empty)"""
+    __slots__ = ('options', *VARIANT_FIELDS)
+
+    def __init__(self, options, sku, barcode, price, compare_at_price, grams, inventory_qty,
+                 requires_shipping, taxable, image):
+        self.options = options
+        self.sku = sku
+        self.barcode = barcode
+        self.price = price
+        self.compare_at_price = compare_at_price
+        self.grams = grams
+        self.inventory_qty = inventory_qty
+        self.requires_shipping = requires_shipping
+        self.taxable = taxable
+        self.image = image
+
+
+class ProductImage:
+    __slots__ = ('src', 'position', 'alt')
+
+    def __init__(self, src, position, alt):
+        self.src = src
+        self.position = position
+        self.alt = alt
+
+
+class Product:
+    """A product with all of its variants and images, from however many
+    export rows it spans"""
+    __slots__ = (*PRODUCT_FIELDS, 'option_names', 'variants', 'images')
+
+    def __init__(self, handle, title, body_html, vendor, category, tags, status, option_names):
+        self.handle = handle
+        self.title = title
+        self.body_html = body_html
+        self.vendor = vendor
+        self.category = category
+        self.tags = tags
+        self.status = status
+        self.option_names = option_names
+        self.variants = []
+        self.images = []
+
+    def first_image(self):
+        """Image with the lowest position (export order breaks ties)"""
+        if not self.images:
+            return None
+        return min(self.images, key=lambda image: int(image.position) if (image.position or '').isdigit() else 0)
+
+
+class ShopifyExport:
+    """Single streaming pass over a Shopify export, grouped by Handle
+
+    products() yields one Product per Handle with every variant and image
+    row attached, reading the file in chunks without building pandas row
+    objects. Shopify writes a product's rows together; rows of a Handle
+    that turns up again after other products are ignored, as
+    drop_duplicates(keep='first') would. rows_read counts the rows seen.
+
+    With `clean_text` the CLEANED_COLUMNS are cleaned as they are read (HTML
+    stripped, entities unescaped, see text_cleanup.py); text_changes counts
+    the cells changed per column.
+    """
+
+    def __init__(self, path, chunksize=DEFAULT_CHUNKSIZE, clean_text=True):
+        self.path = path
+        self.chunksize = chunksize
+        self.clean_text = clean_text
+        self.rows_read = 0
+        self.text_changes = Counter()
+
+    def products(self):
+        seen = set()
+        product = None
+        for chunk in read_export_chunks(self.path, self.chunksize, usecols=lambda c: c in EXPORT_COLUMNS):
+            self.rows_read += len(chunk)
+            if self.clean_text:
+                self.text_changes.update(dict(clean_text_columns(chunk, CLEANED_COLUMNS)))
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            missing = [None] * len(chunk)
+
+            def column(name):
+                if name not in chunk:
+                    return missing
+                values = chunk[name].tolist()
+                if name in INTERNED:
+                    values = [sys.intern(value) if value is not None else None for value in values]
+                return values
+
+            product_columns = [column(name) for name in PRODUCT_FIELDS.values()]
+            variant_columns = [column(name) for name in VARIANT_FIELDS.values()]
+            # No options is stored as None rather than a tuple of Nones
+            option_names = [names if names != (None, None, None) else None
+                            for names in zip(*(column(name) for name in OPTION_NAMES))]
+            option_values = [values if values != (None, None, None) else None
+                             for values in zip(*(column(name) for name in OPTION_VALUES))]
+            images = list(zip(*(column(name) for name in IMAGE_FIELDS)))
+            sku, barcode, price = variant_columns[:3]
+
+            for i, handle in enumerate(product_columns[0]):
+                if handle is None:
+                    continue
+                if product is None or handle != product.handle:
+                    if product is not None:
+                        yield product
+                        product = None
+                    if handle in seen:
+                        continue
+                    seen.add(handle)
+                    product = Product(*(values[i] for values in product_columns), option_names[i])
+                if option_values[i] is not None or sku[i] is not None or price[i] is not None \
+                        or barcode[i] is not None:
+                    product.variants.append(Variant(option_values[i], *(values[i] for values in variant_columns)))
+                if images[i][0] is not None:
+                    product.images.append(ProductImage(*images[i]))
+        if product is not None:
+            yield product
+
+    def frames(self, batch_size=None, active_only=False):
+        """products() as products_frame batches of up to `batch_size` products"""
+        batch_size = batch_size or self.chunksize
+        batch = []
+        for product in self.products():
+            if active_only and product.status != 'active':
+                continue
+            batch.append(product)
+            if len(batch) >= batch_size:
+                yield products_frame(batch)
+                batch = []
+        if batch:
+            yield products_frame(batch)
+
+
+def products_frame(products):
+    """One row per product in export column names, so the processors written
+    for first-row-per-Handle frames keep working
+
+    Product columns come from the product, variant columns from its first
+    variant and Image Src from its first image; Variant Count and Image
+    Count say how many there are.
+    """
+    columns = {name: [getattr(product, field) for product in products] for field, name in PRODUCT_FIELDS.items()}
+    first_variants = [product.variants[0] if product.variants else None for product in products]
+    for field, name in VARIANT_FIELDS.items():
+        columns[name] = [getattr(variant, field) if variant else None for variant in first_variants]
+    first_images = [product.first_image() for product in products]
+    columns['Image Src'] = [image.src if image else None for image in first_images]
+    frame = pd.DataFrame(columns, dtype=str)
+    frame['Variant Count'] = [len(product.variants) for product in products]
+    frame['Image Count'] = [len(product.images) for product in products]
+    return frame
+
+
+def iter_active_products(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield frames of active products, one row per Handle (see products_frame)"""
+    return ShopifyExport(path, chunksize).frames(active_only=True)
+
+
+def first_per_group(path, key, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+    """Streaming equivalent of products_frame(all products).groupby(key).first()
+
+    Returns (grouped frame, total rows read). Only one batch of products
+    plus the per-group result is held in memory at a time.
+    """
+    export = ShopifyExport(path, chunksize)
+    result = None
+    for frame in export.frames():
+        if usecols:
+            frame = frame[list(usecols)]
+        grouped = frame.groupby(key).first()
+        # Existing values win; later chunks only fill gaps and add new groups
+        result = grouped if result is None else result.combine_first(grouped)
+    if result is None:
+        result = pd.DataFrame(columns=[c for c in (usecols or []) if c != key]).rename_axis(key)
+    return result.sort_index(), export.rows_read
@@ -0,0 +1,75 @@
+import argparse
+import importlib
+
+from brands import BRANDS
+
+# Commands only name the module and function they run; the module (and with
+# it pandas, requests, ...) is imported once the command is chosen, so
+# `talabat --help` and the quick summary/check commands start fast.
+# Options left out on the command line are not passed, so the function's
+# own defaults apply.
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='talabat', description="Talabat catalog tools")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Ingest brand Shopify exports into catalogs and images")
+    ingest.add_argument('brands', nargs='*', help=f"Brands to process (default: all of {', '.join(sorted(BRANDS))})")
+    ingest.set_defaults(handler=('brand_ingest', 'ingest_brands'))
+
+    download = commands.add_parser('download', help="Download product images for 265 test.xlsx")
+    download.add_argument('--workers', dest='max_workers', metavar='WORKERS', type=int, help="Concurrent downloads")
+    download.add_argument('--rate-limit', type=float, help="Max requests per second per host")
+    download.add_argument('--refresh', action='store_true', default=None,
+                          help="Revalidate existing images against the CDN (ETag / Last-Modified)")
+    download.set_defaults(handler=('download_final_images', 'main'))
+
+    dedupe = commands.add_parser('dedupe-barcodes', help="Give duplicate barcodes in 265 test.xlsx new ones")
+    dedupe.set_defaults(handler=('fix_duplicate_barcodes', 'main'))
+
+    translate = commands.add_parser('translate', help="Translate missing Arabic titles in 265 test.xlsx")
+    translate.add_argument('--workers', dest='max_workers', metavar='WORKERS', type=int,
+                           help="Concurrent translation requests")
+    translate.add_argument('--url', help="Translation endpoint")
+    translate.set_defaults(handler=('translate_to_arabic', 'translate_missing_arabic'))
+
+    summary = commands.add_parser('summary', help="Summarize every brand project")
+    summary.add_argument('--workers', dest='max_workers', metavar='WORKERS', type=int,
+                         help="Worker processes (default: CPU count)")
+    summary.add_argument('--json', dest='json_file', metavar='FILE',
+                         help="Machine-readable summary output ('' to skip)")
+    summary.add_argument('--no-cache', dest='use_cache', action='store_false', default=None,
+                         help="Recompute every brand")
+    summary.set_defaults(handler=('project_summary', 'generate_project_summary'))
+
+    check = commands.add_parser('check', help="Check the Crayola project for completeness")
+    check.set_defaults(handler=('check_crayola_project', 'check_crayola_project'))
+
+    export = commands.add_parser('export', help="Create the Talabat CSV and images from products_export.csv")
+    export.add_argument('--chunksize', type=int, help="Rows per chunk (bounds peak memory)")
+    export.add_argument('--rate-limit', type=float, help="Max image requests per second per host")
+    export.add_argument('--max-pending', type=int, help="Image downloads queued ahead of the CSV writer")
+    export.add_argument('--full', action='store_true', default=None,
+                        help="Delete new_items/ and rebuild it from scratch")
+    export.set_defaults(handler=('create_talabat_csv', 'main'))
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'ingest':
+        unknown = set(args.brands) - set(BRANDS)
+        if unknown:
+            parser.error(f"unknown brand(s): {', '.join(sorted(unknown))}")
+    module_name, function_name = args.handler
+    options = {name: value for name, value in vars(args).items()
+               if name not in ('command', 'handler') and value is not None}
+    function = getattr(importlib.import_module(module_name), function_name)
+    return function(**options)
+
+
+if __name__ == "__main__":
+    main()
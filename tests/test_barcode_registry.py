@@ -0,0 +1,47 @@
+import pytest
+
+from barcode_registry import EAN_13, UPC_A, BarcodeRegistry, barcodes_for_keys, check_digit, is_valid
+
+
+@pytest.mark.parametrize('code', [
+    '4006381333931', '5901234123457', '6291041500213',  # EAN-13
+    '036000291452', '012345678905', '042100005264',  # UPC-A
+])
+def test_known_check_digits(code):
+    assert check_digit(code[:-1]) == code[-1]
+    assert is_valid(code)
+
+
+def test_wrong_check_digit_invalid():
+    assert not is_valid('4006381333932')
+    assert not is_valid('03600029145X')
+
+
+def test_allocated_codes_valid_and_formatted(tmp_path):
+    with BarcodeRegistry(tmp_path / 'barcodes.sqlite') as registry:
+        for fmt in (UPC_A, EAN_13):
+            codes = registry.allocate(200, project='test', **fmt)
+            assert len(set(codes)) == 200
+            assert all(len(code) == fmt['length'] and code.startswith(fmt['prefix']) and is_valid(code)
+                       for code in codes)
+
+
+def test_allocation_avoids_registered_codes(tmp_path):
+    with BarcodeRegistry(tmp_path / 'barcodes.sqlite') as registry:
+        # All ten codes with body 0100000000<n> but one belong to a vendor
+        vendor = [f'{body}{check_digit(body)}' for body in (f'0100000000{n}' for n in range(10))]
+        registry.register(vendor[1:], project='vendor')
+        allocated = registry.allocate(1, prefix='0100000000', length=12, project='test')
+    assert allocated == [vendor[0]]
+
+
+def test_same_key_same_barcode_across_registry_instances(tmp_path):
+    path = tmp_path / 'barcodes.sqlite'
+    first = barcodes_for_keys(['pen', 'ruler', 'pen'], project='shop', path=path)
+    with BarcodeRegistry(path) as registry:
+        second = registry.assign(['ruler', 'glue', 'pen'], project='shop')
+    assert first[0] == first[2] == second[2]
+    assert first[1] == second[0]
+    assert second[1] not in first
+    # Keys are per project
+    assert barcodes_for_keys(['pen'], project='other', path=path) != [first[0]]
@@ -0,0 +1,35 @@
+import contextlib
+import io
+
+import pandas as pd
+
+from barcode_registry import UPC_A
+from brand_ingest import ingest_brand
+
+CONFIG = {
+    'display_name': 'Test', 'input_csv': 'test.csv', 'output_dir': 'test_brand', 'excel_name': 'test.xlsx',
+    'arabic_prefix': 'تجربة', 'barcode_policy': 'existing', 'image_extensions': ['.png'], 'rate_limit': 0,
+}
+
+
+def ingest():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ingest_brand('test', CONFIG)
+
+
+def test_generated_barcodes_stable_across_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({
+        'Handle': ['pen', 'ruler', 'glue'],
+        'Title': ['Pen', 'Ruler', 'Glue'],
+        'Variant Barcode': ['0712345678901', None, None],
+        'Variant Price': ['1.0', '2.0', '3.0'],
+        'Status': 'active',
+    }).to_csv('test.csv', index=False)
+
+    first = ingest()
+    second = ingest()
+    assert first['barcode'].tolist() == second['barcode'].tolist()
+    assert first['barcode'][0] == '0712345678901'
+    assert first['barcode'][1:].str.startswith(UPC_A['prefix']).all()
+    assert first['barcode'].is_unique
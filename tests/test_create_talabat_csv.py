@@ -0,0 +1,48 @@
+import contextlib
+import io
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import create_talabat_csv
+from bench_pipeline import local_servers
+
+
+@pytest.fixture
+def cdn_url(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with local_servers() as base_url:
+        yield base_url
+
+
+def run(rows):
+    pd.DataFrame(rows).to_csv('products_export.csv', index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_talabat_csv.main(rate_limit=0)
+    return sorted(path.name for path in Path('new_items/images').iterdir())
+
+
+def product(handle, image_url='', status='active'):
+    return {'Handle': handle, 'Title': handle.title(), 'Status': status, 'Image Src': image_url}
+
+
+def test_placeholder_replaced_by_real_image(cdn_url):
+    first = run([product('pen'), product('ruler', cdn_url + '/img/ruler.jpg')])
+    placeholder = next(name for name in first if name.endswith('_placeholder.jpg'))
+    barcode = placeholder.removesuffix('_placeholder.jpg')
+
+    second = run([product('pen', cdn_url + '/img/pen.jpg'), product('ruler', cdn_url + '/img/ruler.jpg')])
+    assert placeholder not in second
+    assert f'{barcode}.jpg' in second
+
+
+def test_removed_product_images_deleted(cdn_url):
+    first = run([product('pen', cdn_url + '/img/pen.jpg'), product('ruler', cdn_url + '/img/ruler.jpg')])
+    second = run([product('ruler', cdn_url + '/img/ruler.jpg')])
+    assert len(first) == 3 and len(second) == 2
+
+
+def test_empty_export_keeps_images(cdn_url):
+    first = run([product('pen', cdn_url + '/img/pen.jpg'), product('ruler')])
+    assert run([product('pen', cdn_url + '/img/pen.jpg', status='draft')]) == first
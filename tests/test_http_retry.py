@@ -0,0 +1,135 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import http_retry
+from http_retry import CircuitBreaker, HostUnavailable, RetryPolicy, is_retryable, retry_after
+
+
+def http_error(status, retry_after_header=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after_header is not None:
+        response.headers['Retry-After'] = retry_after_header
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns 'ok'"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delays RetryPolicy sleeps for instead of waiting"""
+    delays = []
+    monkeypatch.setattr(http_retry.time, 'sleep', delays.append)
+    return delays
+
+
+@pytest.fixture
+def url(request):
+    # Breakers are shared per host, so every test gets a host of its own
+    return f'http://{request.node.name}.test/item'
+
+
+def test_classification():
+    assert not is_retryable(http_error(404))
+    assert not is_retryable(http_error(403))
+    assert not is_retryable(ValueError('bad payload'))
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(429))
+    assert is_retryable(requests.ConnectionError())
+    assert is_retryable(requests.Timeout())
+
+
+def test_permanent_error_not_retried(sleeps, url):
+    func = Flaky(http_error(404))
+    with pytest.raises(requests.HTTPError):
+        RetryPolicy().call(url, func)
+    assert func.calls == 1
+    assert sleeps == []
+
+
+def test_retryable_error_retried_until_success(sleeps, url):
+    func = Flaky(http_error(500), requests.ConnectionError())
+    assert RetryPolicy(base_delay=0.5).call(url, func) == 'ok'
+    assert func.calls == 3
+    assert len(sleeps) == 2 and all(0 <= delay <= 1.0 for delay in sleeps)
+
+
+def test_last_error_raised_when_attempts_run_out(sleeps, url):
+    func = Flaky(*[http_error(502)] * 3)
+    with pytest.raises(requests.HTTPError):
+        RetryPolicy(max_attempts=3).call(url, func)
+    assert func.calls == 3
+
+
+def test_retry_after_parsing():
+    assert retry_after(http_error(429, '120')) == 120.0
+    assert retry_after(http_error(503, '0')) == 0.0
+    assert 85 < retry_after(http_error(503, formatdate(time.time() + 90, usegmt=True))) <= 90
+    assert retry_after(http_error(503, formatdate(time.time() - 90, usegmt=True))) == 0.0
+    assert retry_after(http_error(429, 'soon')) is None
+    assert retry_after(http_error(429)) is None
+    assert retry_after(http_error(500, '120')) is None
+    assert retry_after(requests.ConnectionError()) is None
+
+
+def test_retry_after_honoured_beyond_max_delay(sleeps, url):
+    func = Flaky(http_error(429, '120'))
+    assert RetryPolicy(max_delay=30.0).call(url, func) == 'ok'
+    assert sleeps == [120.0]
+
+
+def test_retry_after_over_limit_gives_up(sleeps, url):
+    func = Flaky(http_error(503, '3600'))
+    with pytest.raises(requests.HTTPError):
+        RetryPolicy(max_retry_after=300.0).call(url, func)
+    assert func.calls == 1
+    assert sleeps == []
+
+
+def test_breaker_opens_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(http_retry.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker('cdn.test', failure_threshold=3, reset_timeout=60)
+
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    with pytest.raises(HostUnavailable):
+        breaker.before_request()
+
+    # After the reset timeout one probe goes through; a failed probe reopens it
+    now[0] += 60
+    breaker.before_request()
+    with pytest.raises(HostUnavailable):
+        breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(HostUnavailable):
+        breaker.before_request()
+
+    # A successful probe closes it
+    now[0] += 60
+    breaker.before_request()
+    breaker.record_success()
+    breaker.before_request()
+    assert breaker.failures == 0
+
+
+def test_throttling_does_not_open_breaker(sleeps, url):
+    policy = RetryPolicy(max_attempts=http_retry.FAILURE_THRESHOLD + 2)
+    func = Flaky(*[http_error(429, '1')] * (http_retry.FAILURE_THRESHOLD + 1))
+    assert policy.call(url, func) == 'ok'
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from image_downloader import DOWNLOADED, FAILED, LINKED, NOT_MODIFIED, ImageDownloader, download_images
+from image_store import ImageStore
+
+IMAGE = bytes(range(256)) * 40
+ETAG = '"v1"'
+LAST_MODIFIED = 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+
+class CDNHandler(BaseHTTPRequestHandler):
+    """Serves IMAGE at any path with ETag / Last-Modified, conditional GETs
+    and single open-ended byte ranges"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        time.sleep(self.server.latency)
+        if self.headers.get('If-None-Match') == ETAG or self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            self._send(304)
+            return
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range', ETAG) == ETAG:
+            start = int(byte_range.removeprefix('bytes=').rstrip('-'))
+            if start >= len(IMAGE):
+                self._send(416, headers={'Content-Range': f'bytes */{len(IMAGE)}'})
+                return
+            self._send(206, IMAGE[start:], {'Content-Range': f'bytes {start}-{len(IMAGE) - 1}/{len(IMAGE)}'})
+            return
+        self._send(200, IMAGE)
+
+
+@pytest.fixture
+def cdn():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CDNHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.latency = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_port}/img/photo.jpg'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def downloader():
+    with ImageDownloader(rate_limit=0) as downloader:
+        yield downloader
+
+
+def test_download(cdn, downloader, tmp_path):
+    target = tmp_path / 'photo.jpg'
+    status, validators = downloader.download_image(cdn.url, target)
+    assert status == DOWNLOADED
+    assert target.read_bytes() == IMAGE
+    assert validators == {'etag': ETAG, 'last_modified': LAST_MODIFIED}
+    assert not (tmp_path / 'photo.jpg.part').exists()
+
+
+def test_resumes_partial_download(cdn, downloader, tmp_path):
+    target = tmp_path / 'photo.jpg'
+    (tmp_path / 'photo.jpg.part').write_bytes(IMAGE[:1000])
+    (tmp_path / 'photo.jpg.part.json').write_text(json.dumps({'etag': ETAG}))
+    status, _ = downloader.download_image(cdn.url, target)
+    assert status == DOWNLOADED
+    assert target.read_bytes() == IMAGE
+    assert cdn.requests[0]['Range'] == 'bytes=1000-'
+    assert cdn.requests[0]['If-Range'] == ETAG
+    assert not (tmp_path / 'photo.jpg.part.json').exists()
+
+
+def test_not_modified(cdn, downloader, tmp_path):
+    target = tmp_path / 'photo.jpg'
+    status, validators = downloader.download_image(
+        cdn.url, target, {'etag': ETAG, 'last_modified': LAST_MODIFIED})
+    assert status == NOT_MODIFIED
+    assert validators == {'etag': ETAG, 'last_modified': LAST_MODIFIED}
+    assert not target.exists()
+    assert cdn.requests[0]['If-None-Match'] == ETAG
+    assert cdn.requests[0]['If-Modified-Since'] == LAST_MODIFIED
+
+
+def test_unsatisfiable_range_restarts(cdn, downloader, tmp_path):
+    target = tmp_path / 'photo.jpg'
+    (tmp_path / 'photo.jpg.part').write_bytes(IMAGE + b'stale')
+    status, _ = downloader.download_image(cdn.url, target)
+    assert status == DOWNLOADED
+    assert target.read_bytes() == IMAGE
+    assert [request.get('Range') for request in cdn.requests] == [f'bytes={len(IMAGE) + 5}-', None]
+
+
+def test_same_url_downloaded_once_for_concurrent_jobs(cdn, tmp_path):
+    cdn.latency = 0.2
+    store = ImageStore(tmp_path / 'store')
+    jobs = [(cdn.url, tmp_path / f'{barcode}.jpg') for barcode in range(4)]
+    results = download_images(jobs, max_workers=4, rate_limit=0, store=store)
+    assert FAILED not in results.values()
+    assert sorted(results.values()) == [DOWNLOADED] + [LINKED] * 3
+    assert all(filename.read_bytes() == IMAGE for _, filename in jobs)
+    assert len(cdn.requests) == 1
+
+
+class BrokenStore(ImageStore):
+    def link(self, sha, filename):
+        raise OSError(28, 'No space left on device')
+
+
+def test_store_error_fails_only_that_job(cdn, tmp_path):
+    jobs = [(cdn.url, tmp_path / 'a.jpg'), (cdn.url + '?b', tmp_path / 'b.jpg')]
+    finished = []
+    results = download_images(jobs, rate_limit=0, store=BrokenStore(tmp_path / 'store'),
+                              on_result=lambda url, filename, status: finished.append(status))
+    assert results == {tmp_path / 'a.jpg': FAILED, tmp_path / 'b.jpg': FAILED}
+    assert finished == [FAILED, FAILED]
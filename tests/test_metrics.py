@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from metrics import Metrics
+
+
+def test_failed_stage_is_recorded(tmp_path):
+    metrics = Metrics(tmp_path)
+    with pytest.raises(ValueError):
+        with metrics.stage('translate', rows=10):
+            raise ValueError('service down')
+    assert metrics.histograms[('stage_seconds', (('stage', 'translate'),))].count == 1
+    assert metrics.value('stage_failures_total', stage='translate') == 1
+    assert metrics.value('rows_processed_total', stage='translate') == 0
+    [event] = [json.loads(line) for line in (tmp_path / 'metrics.jsonl').read_text().splitlines()]
+    assert event['stage'] == 'translate' and event['failed'] is True
+
+
+def test_prometheus_text_has_one_type_line_per_metric():
+    metrics = Metrics()
+    metrics.inc('images_total', status='downloaded')
+    metrics.inc('images_total', status='failed')
+    metrics.inc('rows_read_total', 5)
+    metrics.observe('http_request_seconds', 0.2, kind='image')
+    metrics.observe('http_request_seconds', 0.3, kind='translate')
+    lines = metrics.prometheus_text().splitlines()
+    assert [line for line in lines if line.startswith('#')] == [
+        '# TYPE talabat_images_total counter',
+        '# TYPE talabat_rows_read_total counter',
+        '# TYPE talabat_http_request_seconds histogram',
+    ]
+    assert lines.index('# TYPE talabat_images_total counter') == 0
+    assert lines[lines.index('# TYPE talabat_http_request_seconds histogram') + 1].startswith(
+        'talabat_http_request_seconds_bucket')
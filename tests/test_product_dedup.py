@@ -0,0 +1,25 @@
+import pandas as pd
+
+from product_dedup import find_duplicates
+
+
+def test_groups_never_mix_vendor_barcodes():
+    # Row 1 has no barcode; it matches row 2 by image and row 0 by title,
+    # but rows 0 and 2 carry different barcodes and must stay apart
+    products = pd.DataFrame({
+        'Title': ['Crayola Washable Markers Classic Colors 10 Pack'] * 3,
+        'Variant Barcode': ['0711111111111', '', '0722222222222'],
+        'Image Src': ['', 'https://cdn.example.com/markers.jpg', 'https://cdn.example.com/markers.jpg'],
+    })
+    decisions = find_duplicates(products)
+    assert decisions[['row', 'keep', 'reason']].values.tolist() == [[2, 1, 'image']]
+
+
+def test_same_barcode_merged():
+    products = pd.DataFrame({
+        'Title': ['Blue Pen', 'Red Ruler 30cm', 'Blue Pen'],
+        'Variant Barcode': ['0711111111111', '', '0711111111111'],
+        'Image Src': ['', '', ''],
+    })
+    decisions = find_duplicates(products)
+    assert decisions[['row', 'keep', 'reason']].values.tolist() == [[2, 0, 'barcode']]
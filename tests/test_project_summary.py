@@ -0,0 +1,31 @@
+import contextlib
+import io
+
+import pandas as pd
+
+from brand_ingest import ingest_brand
+from project_summary import brand_metrics
+
+CONFIG = {
+    'display_name': 'Test', 'input_csv': 'test.csv', 'output_dir': 'test_brand', 'excel_name': 'test.xlsx',
+    'arabic_prefix': 'تجربة', 'barcode_policy': 'existing', 'image_extensions': ['.png'], 'rate_limit': 0,
+}
+
+
+def test_generated_barcodes_counted_from_registry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Real vendor UPC-A codes often start with 01 too
+    pd.DataFrame({
+        'Handle': ['pen', 'ruler', 'glue'],
+        'Title': ['Pen', 'Ruler', 'Glue'],
+        'Variant Barcode': ['012345678905', '0712345678901', None],
+        'Variant Price': ['1.0', '2.0', '3.0'],
+        'Status': 'active',
+    }).to_csv('test.csv', index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingest_brand('test', CONFIG)
+
+    metrics = brand_metrics(CONFIG)
+    assert metrics['products'] == 3
+    assert metrics['existing_barcodes'] == 2
+    assert metrics['generated_barcodes'] == 1
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from shopify_export import ShopifyExport
+
+
+def test_text_cleaned_but_identifiers_and_urls_kept(tmp_path):
+    path = tmp_path / 'export.csv'
+    pd.DataFrame([{
+        'Handle': 'pens&reg=1',
+        'Title': 'A&amp;T <b>Pens</b>',
+        'Body (HTML)': '<p>Blue&nbsp;ink</p><p>Pack of 3</p>',
+        'Variant SKU': 'SKU&copy2',
+        'Variant Barcode': '0712345678901',
+        'Image Src': 'https://cdn.example.com/pens.jpg?v=1&copy=2',
+        'Status': 'active',
+    }]).to_csv(path, index=False)
+
+    export = ShopifyExport(path)
+    [product] = export.products()
+    assert product.title == 'A&T Pens'
+    assert product.body_html == 'Blue ink Pack of 3'
+    assert product.handle == 'pens&reg=1'
+    assert product.variants[0].sku == 'SKU&copy2'
+    assert product.images[0].src == 'https://cdn.example.com/pens.jpg?v=1&copy=2'
+    assert dict(export.text_changes) == {'Title': 1, 'Body (HTML)': 1}
@@ -0,0 +1,112 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pytest
+
+from translate_to_arabic import fill_missing_arabic, is_missing, translate_many
+from translation_cache import TranslationCache
+
+
+class TranslatorHandler(BaseHTTPRequestHandler):
+    """Translation endpoint stand-in: each line of `q` becomes 'ترجمة <line>'
+
+    With server.merge_lines a multi-line request is answered with one line
+    fewer; titles in server.failing get a 404.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        text = parse_qs(body)['q'][0]
+        self.server.requests.append(text)
+        lines = text.split('\n')
+        if any(line in self.server.failing for line in lines):
+            self._send(404)
+            return
+        translated = [f'ترجمة {line}' for line in lines]
+        if self.server.merge_lines and len(translated) > 1:
+            translated[-2:] = [' '.join(translated[-2:])]
+        self._send(200, json.dumps([[['\n'.join(translated), text, None, None]]]).encode('utf-8'))
+
+
+@pytest.fixture
+def translator():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TranslatorHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.failing = set()
+    server.merge_lines = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_port}/translate'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with TranslationCache(tmp_path / 'translations.sqlite') as cache:
+        yield cache
+
+
+TITLES = ['Pen', 'Blue  Marker', 'Red Crayon', 'Pen']
+
+
+def test_titles_sent_as_one_batch(translator, cache):
+    results = translate_many(TITLES, cache=cache, url=translator.url)
+    assert translator.requests == ['Pen\nBlue Marker\nRed Crayon']
+    assert results == {'Pen': 'ترجمة Pen', 'Blue Marker': 'ترجمة Blue Marker', 'Red Crayon': 'ترجمة Red Crayon'}
+
+
+def test_line_mismatch_falls_back_to_single_titles(translator, cache):
+    translator.merge_lines = True
+    results = translate_many(TITLES, cache=cache, url=translator.url)
+    assert translator.requests == ['Pen\nBlue Marker\nRed Crayon', 'Pen', 'Blue Marker', 'Red Crayon']
+    assert results['Red Crayon'] == 'ترجمة Red Crayon'
+    assert len(results) == 3
+
+
+def test_rerun_served_from_cache(translator, cache):
+    translate_many(TITLES, cache=cache, url=translator.url)
+    translator.requests.clear()
+    results = translate_many(TITLES, cache=cache, url=translator.url)
+    assert translator.requests == []
+    assert len(results) == 3
+
+
+def test_failed_titles_not_cached(translator, cache):
+    translator.merge_lines = True
+    translator.failing = {'Blue Marker'}
+    results = translate_many(TITLES, cache=cache, url=translator.url)
+    assert set(results) == {'Pen', 'Red Crayon'}
+    assert set(cache.get_many(['Pen', 'Blue Marker', 'Red Crayon'], 'ar')) == {'Pen', 'Red Crayon'}
+
+    # A re-run only asks for the title that failed
+    translator.failing = set()
+    translator.requests.clear()
+    results = translate_many(TITLES, cache=cache, url=translator.url)
+    assert translator.requests == ['Blue Marker']
+    assert len(results) == 3
+
+
+def test_blank_arabic_titles_count_as_missing(translator, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'English Title': ['Pen', 'Ruler', 'Glue', 'Tape'],
+                       'Arabic Title': [None, '', '  ', 'شريط']})
+    assert is_missing(df['Arabic Title']).sum() == 3
+    assert fill_missing_arabic(df, url=translator.url) == 3
+    assert not is_missing(df['Arabic Title']).any()
@@ -0,0 +1,54 @@
+import html
+
+import pandas as pd
+
+# Tags must start with a letter, / or ! so text like "size <5" is left alone
+TAG_PATTERN = r'<[a-zA-Z/!][^>]*>'
+# Tags that separate words become a space rather than nothing
+BREAK_PATTERN = r'<(?:br|hr|/p|/div|/li|/tr|/td|/h[1-6])\b[^>]*>'
+
+
+def clean_text(values):
+    """Strip HTML tags and unescape entities in a Series of text
+
+    Only cells containing '<' or '&' are touched; in those, tags are
+    removed, entities (&amp;, &nbsp;, &#39;, ...) unescaped and whitespace
+    collapsed. Returns (cleaned Series, number of cells changed).
+    """
+    candidates = values.str.contains('[<&]', regex=True, na=False)
+    if not candidates.any():
+        return values, 0
+    original = values[candidates]
+    cleaned = original.str.replace(BREAK_PATTERN, ' ', regex=True).str.replace(TAG_PATTERN, '', regex=True)
+    has_entity = cleaned.str.contains('&', regex=False)
+    cleaned[has_entity] = cleaned[has_entity].map(html.unescape)
+    changed = cleaned != original
+    if not changed.any():
+        return values, 0
+    values = values.copy()
+    values[changed.index[changed]] = cleaned[changed].str.split().str.join(' ')
+    return values, int(changed.sum())
+
+
+def clean_text_columns(df, columns):
+    """clean_text the given text columns of `df` in place (missing ones are skipped)
+
+    Only pass descriptive text: html.unescape also decodes entities without
+    a semicolon, so a URL like '?v=1&copy=2' would become '?v=1©=2'.
+    Returns a list of (column, number of cells changed) for the columns
+    that changed.
+    """
+    changes = []
+    for column in columns:
+        if column not in df.columns:
+            continue
+        if df[column].dtype == 'object':
+            # Object columns may hold numbers only (e.g. barcodes read from Excel)
+            if pd.api.types.infer_dtype(df[column], skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+                continue
+        elif not pd.api.types.is_string_dtype(df[column]):
+            continue
+        df[column], count = clean_text(df[column])
+        if count:
+            changes.append((column, count))
+    return changes
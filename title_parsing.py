@@ -0,0 +1,83 @@
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pandas fallback below
+    pa = None
+
+# Arabic, Arabic Supplement, Arabic Extended-A and the presentation forms.
+# Not a raw string: the escapes become literal characters, which both
+# Python re and Arrow's RE2 accept.
+ARABIC_PATTERN = '[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]'
+SEPARATOR = '||'
+
+
+def has_arabic(titles):
+    """Boolean Series: does each title contain any Arabic script?"""
+    return titles.str.contains(ARABIC_PATTERN, regex=True, na=False)
+
+
+def _split_arrow(titles, arabic_prefix):
+    """split_titles on Arrow compute kernels (no per-row Python)"""
+    raw = pa.array(titles.astype('string[pyarrow]'))
+    is_text = pc.is_valid(raw)
+    empty = pa.scalar('', raw.type)
+    text = pc.fill_null(raw, empty)
+
+    # Appending a separator guarantees a second list element for every title
+    joined = pc.binary_join_element_wise(text, pa.scalar(SEPARATOR, raw.type), empty)
+    parts = pc.split_pattern(joined, SEPARATOR)
+    has_separator = pc.greater(pc.list_value_length(parts), 2)
+
+    english = pc.utf8_trim_whitespace(pc.list_element(parts, 0))
+    tagged_arabic = pc.utf8_trim_whitespace(pc.list_element(parts, 1))
+    if arabic_prefix is not None:
+        prefix = pa.scalar(arabic_prefix, raw.type)
+        prefixed = pc.binary_join_element_wise(prefix, text, pa.scalar(' ', raw.type))
+        untagged_arabic = pc.if_else(is_text, prefixed, empty)
+    else:
+        untagged_arabic = pc.if_else(pc.match_substring_regex(text, ARABIC_PATTERN), text, empty)
+    arabic = pc.if_else(has_separator, tagged_arabic, untagged_arabic)
+
+    def to_series(values):
+        return pd.Series(pd.arrays.ArrowStringArray(values), index=titles.index)
+
+    return to_series(english), to_series(arabic)
+
+
+def _split_pandas(titles, arabic_prefix):
+    """split_titles with pandas .str methods (used when pyarrow is missing)"""
+    is_text = titles.notna()
+    text = titles.where(is_text, '').astype(str)
+
+    parts = text.str.partition(SEPARATOR)
+    has_separator = parts[1] != ''
+    english = parts[0].str.strip()
+    tagged_arabic = parts[2].str.partition(SEPARATOR)[0].str.strip()
+    if arabic_prefix is not None:
+        untagged_arabic = (arabic_prefix + ' ' + text).where(is_text, '')
+    else:
+        untagged_arabic = text.where(has_arabic(text), '')
+    arabic = tagged_arabic.where(has_separator, untagged_arabic)
+    return english, arabic
+
+
+def split_titles(titles, arabic_prefix=None):
+    """Split combined "English || Arabic" titles for a whole Series at once
+
+    Returns (english, arabic) Series aligned with `titles`. Titles without a
+    separator keep the whole (stripped) title as English; their Arabic is:
+      - `arabic_prefix` + ' ' + title when a prefix is given (brand projects)
+      - the title itself when it contains Arabic script, else ''
+    Missing titles give empty strings for both.
+    """
+    if pa is not None:
+        return _split_arrow(titles, arabic_prefix)
+    return _split_pandas(titles, arabic_prefix)
+
+
+def add_title_columns(df, source='Title', english='English Title', arabic='Arabic Title', arabic_prefix=None):
+    """Fill English/Arabic title columns of `df` from its combined title column"""
+    df[english], df[arabic] = split_titles(df[source], arabic_prefix)
+    return df
@@ -1,49 +1,166 @@
+import argparse
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import requests
-import time
-import json
 
-def translate_text(text, target_lang='ar'):
+from catalog_store import catalog_exists, load_catalog, save_catalog
+from http_retry import DEFAULT_POLICY, HostUnavailable, is_retryable
+from metrics import metrics
+from translation_cache import TranslationCache
+
+# Using a free translation service
+TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+
+# Titles per request and characters per request (the service accepts
+# newline-separated text and translates each line separately)
+BATCH_SIZE = 50
+BATCH_CHARS = 4000
+
+def post_translation(session, url, params, text):
+    with metrics.timer('http_request_seconds', kind='translate'):
+        response = session.post(url, params=params, data={'q': text}, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def request_translation(session, text, target_lang='ar', url=TRANSLATE_URL):
+    """Send one translation request (retried per DEFAULT_POLICY) and return the translated text"""
+    params = {
+        'client': 'gtx',
+        'sl': 'en',
+        'tl': target_lang,
+        'dt': 't',
+    }
+    translation_data = DEFAULT_POLICY.call(url, post_translation, session, url, params, text, kind='translate')
+    
+    # Extract translation from response
+    if translation_data and len(translation_data) > 0:
+        return ''.join([part[0] for part in translation_data[0] if part[0]])
+    raise ValueError("empty translation response")
+
+def translate_text(text, target_lang='ar', url=TRANSLATE_URL):
     """Translate text using Google Translate API (free alternative)"""
     try:
-        # Using a free translation service
-        url = "https://translate.googleapis.com/translate_a/single"
-        params = {
-            'client': 'gtx',
-            'sl': 'en',
-            'tl': target_lang,
-            'dt': 't',
-            'q': text
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        # Extract translation from response
-        translation_data = response.json()
-        if translation_data and len(translation_data) > 0:
-            translated_text = ''.join([part[0] for part in translation_data[0] if part[0]])
-            return translated_text.strip()
-        
-        return text  # Return original if translation fails
-        
+        with requests.Session() as session:
+            return request_translation(session, text, target_lang, url).strip()
     except Exception as e:
         print(f"⚠️  Translation error for '{text[:30]}...': {e}")
         return text  # Return original text if translation fails
 
-def translate_missing_arabic():
+def translate_batch(session, texts, target_lang='ar', url=TRANSLATE_URL):
+    """Translate several titles with one newline-joined request
+
+    Falls back to one request per title if the batch request is rejected or
+    the translated lines do not line up with the input; titles that still
+    fail come back as None. If the service itself is down (retries used up
+    or circuit open) the whole batch comes back as None.
+    """
+    if len(texts) > 1:
+        try:
+            lines = request_translation(session, '\n'.join(texts), target_lang, url).split('\n')
+            if len(lines) == len(texts):
+                return [line.strip() for line in lines]
+        except Exception as e:
+            if isinstance(e, HostUnavailable) or is_retryable(e):
+                metrics.inc('failures_total', len(texts), kind='translate')
+                print(f"⚠️  Batch translation failed: {e}")
+                return [None] * len(texts)
+            print(f"⚠️  Batch translation failed, retrying titles one by one: {e}")
+    
+    translations = []
+    for text in texts:
+        try:
+            translations.append(request_translation(session, text, target_lang, url).strip())
+        except Exception as e:
+            metrics.inc('failures_total', kind='translate')
+            print(f"⚠️  Translation error for '{text[:30]}...': {e}")
+            translations.append(None)
+    return translations
+
+def make_batches(texts, batch_size=BATCH_SIZE, batch_chars=BATCH_CHARS):
+    """Group texts into batches bounded by count and total characters"""
+    batch, chars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= batch_size or chars + len(text) > batch_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text) + 1
+    if batch:
+        yield batch
+
+def translate_many(texts, target_lang='ar', cache=None, max_workers=4, url=TRANSLATE_URL):
+    """Translate many texts using the cache, batching and a bounded worker pool
+
+    Returns {text: translation} for every text that was cached or translated
+    successfully; failed batches are left out (and not cached) so a re-run
+    picks them up again.
+    """
+    # Newlines would break batch splitting; titles never need them
+    unique_texts = list(dict.fromkeys(' '.join(text.split()) for text in texts if text and text.strip()))
+    cache = cache if cache is not None else TranslationCache()
+    results = cache.get_many(unique_texts, target_lang)
+    pending = [text for text in unique_texts if text not in results]
+    metrics.inc('cache_hits_total', len(results), cache='translation')
+    print(f"💾 {len(results)} translations from cache, {len(pending)} to translate")
+    
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(translate_batch, session, batch, target_lang, url): batch
+                   for batch in make_batches(pending)}
+        done = 0
+        for future in as_completed(futures):
+            batch = futures[future]
+            translated = {text: translation for text, translation in zip(batch, future.result())
+                          if translation is not None}
+            # Cache writes happen on this thread only
+            cache.put_many(translated, target_lang)
+            results.update(translated)
+            done += len(batch)
+            metrics.inc('rows_processed_total', len(batch), stage='translate')
+            metrics.progress('translations', done, len(pending))
+    
+    return results
+
+def is_missing(values):
+    """True for empty cells: NaN/None, '' or whitespace only"""
+    return values.isna() | (values.astype(str).str.strip() == '')
+
+def fill_missing_arabic(df, english_column='English Title', arabic_column='Arabic Title', max_workers=4,
+                        url=TRANSLATE_URL):
+    """Translate the English title of every row without an Arabic title
+
+    Updates `df` in place and returns the number of rows filled in.
+    """
+    missing_arabic_mask = is_missing(df[arabic_column])
+    
+    # Translate missing titles (cached, batched and concurrent)
+    english_titles = df.loc[missing_arabic_mask, english_column]
+    english_titles = english_titles[english_titles.notna()].astype(str)
+    normalized = english_titles.map(lambda title: ' '.join(title.split()))
+    if normalized.empty:
+        return 0
+    
+    with TranslationCache() as cache:
+        translations = translate_many(normalized, 'ar', cache=cache, max_workers=max_workers, url=url)
+    
+    # Update the Arabic Title column (an all-empty column is read as float)
+    df[arabic_column] = df[arabic_column].astype(object)
+    translated = normalized.map(translations).dropna()
+    df.loc[translated.index, arabic_column] = translated
+    return len(translated)
+
+def translate_missing_arabic(max_workers=4, url=TRANSLATE_URL):
     """Translate missing Arabic translations in 265 test.xlsx"""
     
     print("Translating missing Arabic translations in 265 test.xlsx...")
     
     # Load the Excel file
     excel_file = Path('list/excel/265 test.xlsx')
-    if not excel_file.exists():
+    if not catalog_exists(excel_file):
         print("❌ list/excel/265 test.xlsx file not found!")
         return
     
-    df = pd.read_excel(excel_file)
+    df = load_catalog(excel_file)
     print(f"✅ Loaded 265 test.xlsx with {len(df)} products")
     
     # Check Arabic Title column
@@ -59,8 +176,7 @@ def translate_missing_arabic():
         return
     
     # Find rows missing Arabic translations
-    missing_arabic_mask = df[arabic_column].isna()
-    missing_count = missing_arabic_mask.sum()
+    missing_count = is_missing(df[arabic_column]).sum()
     
     if missing_count == 0:
         print("🎉 All products already have Arabic translations!")
@@ -68,39 +184,17 @@ def translate_missing_arabic():
     
     print(f"📋 Found {missing_count} products missing Arabic translations")
     
-    # Translate missing titles
-    translations_made = 0
-    for idx, row in df[missing_arabic_mask].iterrows():
-        english_title = str(row[english_column]) if pd.notna(row[english_column]) else ''
-        
-        if english_title and english_title.strip():
-            print(f"🔄 Translating: {english_title[:50]}...")
-            
-            # Translate to Arabic
-            arabic_translation = translate_text(english_title, 'ar')
-            
-            # Update the Arabic Title column
-            df.at[idx, arabic_column] = arabic_translation
-            translations_made += 1
-            
-            print(f"✅ Translated: {arabic_translation[:50]}...")
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(0.5)
-            
-            # Show progress every 10 translations
-            if translations_made % 10 == 0:
-                print(f"📊 Progress: {translations_made}/{missing_count} translations completed")
+    translations_made = fill_missing_arabic(df, english_column, arabic_column, max_workers, url)
     
     print(f"\n✅ Completed {translations_made} translations")
     
     # Save the updated Excel file
-    df.to_excel(excel_file, index=False)
+    save_catalog(df, excel_file)
     print(f"✅ Updated {excel_file}")
     
     # Final statistics
-    final_missing = df[arabic_column].isna().sum()
-    final_has_arabic = df[arabic_column].notna().sum()
+    final_missing = is_missing(df[arabic_column]).sum()
+    final_has_arabic = len(df) - final_missing
     
     print(f"\n=== FINAL STATISTICS ===")
     print(f"Total products: {len(df)}")
@@ -111,11 +205,15 @@ def translate_missing_arabic():
     # Show sample of new translations
     if translations_made > 0:
         print(f"\n📝 Sample of new translations:")
-        new_translations = df[df[arabic_column].notna()].tail(5)  # Show last 5
+        new_translations = df[~is_missing(df[arabic_column])].tail(5)  # Show last 5
         for idx, row in new_translations.iterrows():
             english = str(row[english_column])[:40] if pd.notna(row[english_column]) else ''
             arabic = str(row[arabic_column])[:40] if pd.notna(row[arabic_column]) else ''
             print(f"  {english}... → {arabic}...")
 
 if __name__ == "__main__":
-    translate_missing_arabic()
+    parser = argparse.ArgumentParser(description="Translate missing Arabic titles in list/excel/265 test.xlsx")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent translation requests")
+    parser.add_argument('--url', default=TRANSLATE_URL, help="Translation endpoint")
+    args = parser.parse_args()
+    translate_missing_arabic(max_workers=args.workers, url=args.url)
@@ -0,0 +1,64 @@
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE = 'translations.sqlite'
+
+# SQLite limits the number of host parameters per statement
+_QUERY_BATCH = 900
+
+
+class TranslationCache:
+    """Persistent cache of translations keyed by (source text, target language)
+
+    Shared by every project, so a title translated once for one brand is
+    never paid for again, and a re-run after a partial failure only
+    translates what is still missing.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (source, target_lang)
+            ) WITHOUT ROWID
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def get_many(self, texts, target_lang):
+        """Return {source: translation} for the texts that are cached"""
+        texts = list(texts)
+        found = {}
+        for start in range(0, len(texts), _QUERY_BATCH):
+            batch = texts[start:start + _QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f'SELECT source, translation FROM translations WHERE target_lang = ? AND source IN ({placeholders})',
+                [target_lang, *batch])
+            found.update(rows)
+        return found
+
+    def put_many(self, translations, target_lang):
+        """Store {source: translation} pairs"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO translations (source, target_lang, translation, created_at) VALUES (?, ?, ?, ?)',
+                [(source, target_lang, translation, now) for source, translation in translations.items()])
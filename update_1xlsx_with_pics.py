@@ -1,7 +1,35 @@
-import pandas as pd
-import os
 from pathlib import Path
-import shutil
+
+from excel_io import read_excel, write_excel
+from image_manifest import load_manifest
+from image_store import ImageStore
+
+def plan_image_sync(wanted, current):
+    """Work out what has to change to make a folder hold exactly `wanted`
+
+    `wanted` maps file name -> (source path, sha256) and `current` is the
+    target folder's manifest entries. Files whose hash already matches are
+    left alone. Returns (names to link, names to delete); both are found
+    with dict lookups, so the plan is linear in the number of files.
+    """
+    to_link = [name for name, (_, sha) in wanted.items()
+               if current.get(name, {}).get('sha256') != sha]
+    to_delete = [name for name in current if name not in wanted]
+    return to_link, to_delete
+
+def apply_image_sync(wanted, to_link, to_delete, manifest, store):
+    """Apply a plan from plan_image_sync to the folder of `manifest`"""
+    for name in to_delete:
+        path = manifest.directory / name
+        if path.exists() or path.is_symlink():
+            path.unlink()
+        manifest.discard(name)
+    for name in to_link:
+        source, sha = wanted[name]
+        dest = manifest.directory / name
+        store.link_existing(source, dest, sha=sha)
+        manifest.record(dest, sha256=sha)
+    manifest.save()
 
 def main():
     print("Updating list/excel/1.xlsx to match list/pics folder barcodes...")
@@ -12,7 +40,7 @@ def main():
         print("❌ list/excel/1.xlsx file not found!")
         return
     
-    df = pd.read_excel(excel_file)
+    df = read_excel(excel_file)
     print(f"Loaded 1.xlsx with {len(df)} products")
     print(f"Columns: {df.columns.tolist()}")
     
@@ -26,18 +54,13 @@ def main():
         print("❌ list/pics folder not found!")
         return
     
-    pics_files = list(pics_folder.glob('*'))
-    pics_files = [f for f in pics_files if f.is_file()]  # Only files, not directories
-    print(f"Found {len(pics_files)} image files in pics folder")
-    
-    # Extract barcodes from pic filenames (remove extension)
-    pic_barcodes = []
-    for pic_file in pics_files:
-        barcode = pic_file.stem  # filename without extension
-        pic_barcodes.append(barcode)
+    # Index the pics folder once: barcode -> file name
+    pics_manifest = load_manifest(pics_folder)
+    pics_by_barcode = pics_manifest.by_barcode()
+    print(f"Found {len(pics_manifest)} image files in pics folder")
     
     # Sort for consistent assignment
-    sorted_pic_barcodes = sorted(pic_barcodes)
+    sorted_pic_barcodes = sorted(pics_by_barcode)
     
     print(f"\nFirst 10 barcodes from pics folder:")
     for i, barcode in enumerate(sorted_pic_barcodes[:10]):
@@ -45,7 +68,7 @@ def main():
     
     print(f"\nComparison:")
     print(f"  Products in 1.xlsx: {len(df)}")
-    print(f"  Images in pics folder: {len(pic_barcodes)}")
+    print(f"  Images in pics folder: {len(sorted_pic_barcodes)}")
     
     # Identify the barcode column in the Excel file
     barcode_column = None
@@ -66,98 +89,78 @@ def main():
     # Update barcodes in the Excel file
     print(f"\nUpdating barcodes in 1.xlsx...")
     
-    changes_made = []
-    for i, (idx, row) in enumerate(df.iterrows()):
-        if i < len(sorted_pic_barcodes):
-            old_barcode = str(row[barcode_column]) if pd.notna(row[barcode_column]) else "None"
-            new_barcode = sorted_pic_barcodes[i]
-            
-            # Update the barcode
-            df.at[idx, barcode_column] = new_barcode
-            
-            # Get product title for reference
-            title_col = 'Title' if 'Title' in df.columns else df.columns[1]  # Use Title or second column
-            title = str(row[title_col])[:40] if pd.notna(row[title_col]) else "No Title"
-            
-            changes_made.append({
-                'title': title,
-                'old_barcode': old_barcode,
-                'new_barcode': new_barcode,
-                'index': i
-            })
-            
-            if i < 5:  # Show first 5 changes
-                print(f"  {i+1}. {title}...")
-                print(f"     {old_barcode} → {new_barcode}")
-        else:
-            print(f"⚠️  Product {i+1} has no matching image from pics folder")
+    assigned = min(len(df), len(sorted_pic_barcodes))
+    title_col = 'Title' if 'Title' in df.columns else df.columns[1]  # Use Title or second column
+    old_barcodes = df[barcode_column].iloc[:assigned].fillna('None').astype(str).tolist()
+    titles = df[title_col].iloc[:assigned].fillna('No Title').astype(str).str[:40].tolist()
+    new_barcodes = sorted_pic_barcodes[:assigned]
+    
+    df[barcode_column] = df[barcode_column].astype(object)
+    df.iloc[:assigned, df.columns.get_loc(barcode_column)] = new_barcodes
+    
+    changes_made = [
+        {'title': title, 'old_barcode': old, 'new_barcode': new, 'index': i}
+        for i, (title, old, new) in enumerate(zip(titles, old_barcodes, new_barcodes))
+    ]
+    for change in changes_made[:5]:  # Show first 5 changes
+        print(f"  {change['index']+1}. {change['title']}...")
+        print(f"     {change['old_barcode']} → {change['new_barcode']}")
+    for i in range(assigned, len(df)):
+        print(f"⚠️  Product {i+1} has no matching image from pics folder")
     
     # Save the updated Excel file
-    df.to_excel(excel_file, index=False)
+    write_excel(df, excel_file)
     print(f"\n✅ Updated {excel_file} with {len(changes_made)} barcode changes")
     
-    # Now copy images from pics folder to downloaded_images with correct barcode names
+    # Make downloaded_images hold exactly the assigned pics, touching only
+    # the files that differ instead of clearing and re-copying the folder
     downloaded_images_dir = Path('downloaded_images')
+    downloaded_images_dir.mkdir(exist_ok=True)
+    
+    print(f"\nSyncing images from pics folder into downloaded_images...")
+    store = ImageStore()
+    target_manifest = load_manifest(downloaded_images_dir)
     
-    # Clear existing downloaded_images folder and recreate
-    if downloaded_images_dir.exists():
-        shutil.rmtree(downloaded_images_dir)
-    downloaded_images_dir.mkdir()
-    
-    print(f"\nCopying images from pics folder to downloaded_images...")
-    
-    copied_count = 0
-    for change in changes_made:
-        new_barcode = change['new_barcode']
-        title = change['title']
-        
-        # Find the source image in pics folder
-        source_files = list(pics_folder.glob(f"{new_barcode}.*"))
-        
-        if source_files:
-            source_file = source_files[0]  # Take first match
-            extension = source_file.suffix
-            dest_file = downloaded_images_dir / f"{new_barcode}{extension}"
-            
-            # Copy the file
-            shutil.copy2(source_file, dest_file)
-            copied_count += 1
-            
-            if copied_count <= 5:  # Show first 5 copies
-                print(f"  ✅ Copied: {source_file.name} → {dest_file.name}")
-        else:
-            print(f"  ❌ No image found for barcode: {new_barcode}")
-    
-    print(f"\n✅ Copied {copied_count} images to downloaded_images folder")
+    wanted = {}
+    for barcode in new_barcodes:
+        name = pics_by_barcode[barcode]
+        wanted[name] = (pics_folder / name, pics_manifest.entries[name]['sha256'])
+    
+    to_link, to_delete = plan_image_sync(wanted, target_manifest.entries)
+    print(f"  {len(wanted) - len(to_link)} images already in place, {len(to_link)} to link, {len(to_delete)} to remove")
+    apply_image_sync(wanted, to_link, to_delete, target_manifest, store)
+    store.save()
+    
+    for name in to_link[:5]:  # Show first 5 links
+        print(f"  ✅ Linked: {name}")
+    
+    print(f"\n✅ Linked {len(to_link)} images and removed {len(to_delete)} from downloaded_images folder")
     
     # Final verification
     print(f"\n=== FINAL VERIFICATION ===")
-    df_final = pd.read_excel(excel_file)
-    final_images = list(downloaded_images_dir.glob('*'))
+    df_final = df
     
     excel_barcodes = df_final[barcode_column].astype(str).tolist()
-    image_barcodes = [f.stem for f in final_images]
+    image_barcodes = target_manifest.barcodes()
     
     matches = sum(1 for barcode in excel_barcodes if barcode in image_barcodes)
     
     print(f"Products in list/excel/1.xlsx: {len(df_final)}")
-    print(f"Images in downloaded_images: {len(final_images)}")
+    print(f"Images in downloaded_images: {len(target_manifest)}")
     print(f"Perfect matches: {matches}")
     print(f"Barcode column used: '{barcode_column}'")
     
-    if matches == len(df_final) and matches == len(final_images):
+    if matches == len(df_final) and matches == len(target_manifest):
         print("\n🎉 PERFECT! All barcodes in 1.xlsx now match pics folder image names!")
         print("✅ All products have correct barcodes from pics folder")
-        print("✅ All images copied and renamed correctly")
+        print("✅ All images linked and renamed correctly")
         print("✅ Ready for use!")
     else:
         print(f"\n⚠️  {len(df_final) - matches} products don't have matching images")
-        
+    
         # Show sample of updated data
         print(f"\nSample of updated data:")
         print(df_final.head(3).to_string(index=False))
 
 if __name__ == "__main__":
     main()
-
-